@@ -0,0 +1,425 @@
+import pickle
+import socket
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit
+
+from django.core.cache.backends import filebased, locmem
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+MISSING = object()
+# Первый байт значения в Redis: pickle как есть или сжатый zlib. Целые
+# хранятся строкой цифр, чтобы incr выполнялся на сервере.
+RAW = b'p'
+COMPRESSED = b'z'
+
+
+class CacheServerError(Exception):
+    """Сервер кеша ответил ошибкой."""
+
+
+class CacheMetricsMixin:
+    """Считает попадания и промахи чтений кеша в этом процессе."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hits = self.misses = 0
+        self._metrics_lock = threading.Lock()
+
+    def record(self, hits, misses):
+        with self._metrics_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, MISSING, version)
+        if value is MISSING:
+            self.record(0, 1)
+            return default
+        self.record(1, 0)
+        return value
+
+    def metrics(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 3) if total else None,
+        }
+
+
+class LocMemCache(CacheMetricsMixin, locmem.LocMemCache):
+    """Кеш в памяти процесса с учётом попаданий."""
+
+
+class FileBasedCache(CacheMetricsMixin, filebased.FileBasedCache):
+    """Кеш в общем каталоге; значения в файлах уже сжаты zlib."""
+
+
+class RedisCache(CacheMetricsMixin, BaseCache):
+    """Кеш на сервере с протоколом Redis, общий для всех процессов.
+
+    LOCATION — redis://host:port/db. Ключи пространства имён получают
+    KEY_PREFIX, и clear() удаляет только их. Значения длиннее
+    OPTIONS['COMPRESS_MIN_LENGTH'] байт (отрендеренные страницы)
+    сжимаются. Соединение своё у каждого потока; пачки команд
+    set_many отправляются за один обмен с сервером.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        url = urlsplit(server)
+        self.address = (url.hostname or 'localhost', url.port or 6379)
+        self.db = int(url.path.strip('/') or 0)
+        options = params.get('OPTIONS', {})
+        self.compress_min_length = options.get('COMPRESS_MIN_LENGTH', 1024)
+        self.socket_timeout = options.get('SOCKET_TIMEOUT', 5)
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, self.socket_timeout)
+        self._local.socket = sock
+        self._local.file = sock.makefile('rb')
+        if self.db:
+            self._send(sock, [('SELECT', self.db)])
+            self._read(self._local.file)
+        return sock, self._local.file
+
+    def _send(self, sock, commands):
+        parts = []
+        for command in commands:
+            parts.append(b'*%d\r\n' % len(command))
+            for arg in command:
+                if not isinstance(arg, bytes):
+                    arg = str(arg).encode()
+                parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        sock.sendall(b''.join(parts))
+
+    def _read(self, file):
+        line = file.readline()
+        if not line:
+            raise ConnectionError('Сервер кеша закрыл соединение')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            return CacheServerError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            return None if length < 0 else file.read(length + 2)[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [
+                self._read(file) for _ in range(length)]
+        raise CacheServerError(f'Непонятный ответ сервера: {line!r}')
+
+    def pipeline(self, commands):
+        """Отправляет команды разом и возвращает ответы по порядку.
+
+        Оборванное соединение открывается заново один раз.
+        """
+        for attempt in (1, 2):
+            if getattr(self._local, 'socket', None) is None:
+                sock, file = self._connect()
+            else:
+                sock, file = self._local.socket, self._local.file
+            try:
+                self._send(sock, commands)
+                replies = [self._read(file) for _ in commands]
+                break
+            except OSError:
+                self.disconnect()
+                if attempt == 2:
+                    raise
+        for reply in replies:
+            if isinstance(reply, CacheServerError):
+                raise reply
+        return replies
+
+    def command(self, *args):
+        return self.pipeline([args])[0]
+
+    def disconnect(self):
+        sock = getattr(self._local, 'socket', None)
+        if sock is not None:
+            self._local.file.close()
+            sock.close()
+            self._local.socket = self._local.file = None
+
+    def dumps(self, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) >= self.compress_min_length:
+            return COMPRESSED + zlib.compress(data)
+        return RAW + data
+
+    def loads(self, data):
+        if data[:1] == COMPRESSED:
+            return pickle.loads(zlib.decompress(data[1:]))
+        if data[:1] == RAW:
+            return pickle.loads(data[1:])
+        return int(data)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _set_command(self, key, value, timeout, *flags):
+        """SET с временем жизни в миллисекундах; None — бессрочно."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        command = ('SET', key, self.dumps(value)) + flags
+        if timeout is None:
+            return command
+        return command + ('PX', max(int(timeout * 1000), 1))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.command(*self._set_command(
+            self._key(key, version), value, timeout, 'NX')) is not None
+
+    def get(self, key, default=None, version=None):
+        data = self.command('GET', self._key(key, version))
+        if data is None:
+            self.record(0, 1)
+            return default
+        self.record(1, 0)
+        return self.loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is not None and timeout <= 0:
+            self.delete(key, version)
+            return
+        self.command(*self._set_command(
+            self._key(key, version), value, timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        key = self._key(key, version)
+        if timeout is None:
+            self.command('PERSIST', key)
+            return bool(self.command('EXISTS', key))
+        return bool(self.command(
+            'PEXPIRE', key, max(int(timeout * 1000), 1)))
+
+    def delete(self, key, version=None):
+        self.command('DEL', self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.command(
+            'MGET', *(self._key(key, version) for key in keys))
+        found = {key: self.loads(data)
+                 for key, data in zip(keys, values) if data is not None}
+        self.record(len(found), len(keys) - len(found))
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if data:
+            self.pipeline([
+                self._set_command(self._key(key, version), value, timeout)
+                for key, value in data.items()])
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self.command('DEL', *keys)
+
+    def has_key(self, key, version=None):
+        return bool(self.command('EXISTS', self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        if not self.has_key(key, version):
+            raise ValueError(f"Key '{key}' not found")
+        try:
+            return self.command('INCRBY', self._key(key, version), delta)
+        except CacheServerError as exc:
+            raise ValueError(str(exc)) from exc
+
+    def clear(self):
+        """Удаляет только ключи своего пространства имён."""
+        pattern = f'{self.key_prefix}:*'
+        cursor = '0'
+        while True:
+            cursor, keys = self.command(
+                'SCAN', cursor, 'MATCH', pattern, 'COUNT', 1000)
+            if keys:
+                self.command('DEL', *keys)
+            cursor = cursor.decode()
+            if cursor == '0':
+                return
+
+    def metrics(self):
+        """Счётчики процесса и общие счётчики сервера из INFO stats."""
+        metrics = super().metrics()
+        info = self.command('INFO', 'stats').decode()
+        for line in info.splitlines():
+            name, _, value = line.partition(':')
+            if name in ('keyspace_hits', 'keyspace_misses'):
+                metrics[f'server_{name[len("keyspace_"):]}'] = int(value)
+        return metrics
+
+
+class LocalRedisServer:
+    """Небольшой сервер с протоколом Redis для тестов и разработки.
+
+    Понимает ровно те команды, которыми пользуется RedisCache, и хранит
+    данные в памяти. Заменяет настоящий Redis, когда его нет под рукой.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.data = {}
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+        self.listener = socket.create_server((host, port))
+        self.address = self.listener.getsockname()
+        self.thread = None
+
+    @property
+    def url(self):
+        return f'redis://{self.address[0]}:{self.address[1]}/0'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.listener.close()
+
+    def serve_forever(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self.handle, args=(client,),
+                             daemon=True).start()
+
+    def handle(self, client):
+        file = client.makefile('rb')
+        try:
+            while True:
+                line = file.readline()
+                if not line:
+                    return
+                args = []
+                for _ in range(int(line[1:-2])):
+                    length = int(file.readline()[1:-2])
+                    args.append(file.read(length + 2)[:-2])
+                with self.lock:
+                    reply = self.execute(args[0].decode().upper(), args[1:])
+                client.sendall(self.encode(reply))
+        except OSError:
+            return
+        finally:
+            file.close()
+            client.close()
+
+    def encode(self, reply):
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, CacheServerError):
+            return b'-ERR %s\r\n' % str(reply).encode()
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, str):
+            return b'+%s\r\n' % reply.encode()
+        if isinstance(reply, list):
+            return b'*%d\r\n' % len(reply) + b''.join(
+                self.encode(item) for item in reply)
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+    def lookup(self, key):
+        value, expires = self.data.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, name, args):
+        handler = getattr(self, f'command_{name.lower()}', None)
+        if handler is None:
+            return CacheServerError(f"unknown command '{name}'")
+        return handler(*args)
+
+    def command_ping(self):
+        return 'PONG'
+
+    def command_select(self, db):
+        return 'OK'
+
+    def command_flushdb(self):
+        self.data.clear()
+        return 'OK'
+
+    def command_mget(self, *keys):
+        values = [self.lookup(key) for key in keys]
+        found = sum(value is not None for value in values)
+        self.hits += found
+        self.misses += len(values) - found
+        return values
+
+    def command_get(self, key):
+        return self.command_mget(key)[0]
+
+    def command_set(self, key, value, *options):
+        flags = [option.upper() for option in options]
+        if b'NX' in flags and self.lookup(key) is not None:
+            return None
+        expires = None
+        if b'PX' in flags:
+            expires = (time.monotonic()
+                       + int(options[flags.index(b'PX') + 1]) / 1000)
+        self.data[key] = (value, expires)
+        return 'OK'
+
+    def command_del(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def command_exists(self, *keys):
+        return sum(self.lookup(key) is not None for key in keys)
+
+    def command_incrby(self, key, delta):
+        value = self.lookup(key) or b'0'
+        if not value.lstrip(b'-').isdigit():
+            return CacheServerError('value is not an integer')
+        value = int(value) + int(delta)
+        self.data[key] = (str(value).encode(),
+                          self.data.get(key, (None, None))[1])
+        return value
+
+    def command_pexpire(self, key, milliseconds):
+        value = self.lookup(key)
+        if value is None:
+            return 0
+        self.data[key] = (value, time.monotonic() + int(milliseconds) / 1000)
+        return 1
+
+    def command_persist(self, key):
+        value = self.lookup(key)
+        if value is None:
+            return 0
+        self.data[key] = (value, None)
+        return 1
+
+    def command_scan(self, cursor, *options):
+        """Всё за один проход; MATCH понимается только как префикс*."""
+        prefix = options[options.index(b'MATCH') + 1].rstrip(b'*')
+        return [b'0', [key for key in list(self.data)
+                       if key.startswith(prefix)
+                       and self.lookup(key) is not None]]
+
+    def command_info(self, *sections):
+        return (f'# Stats\r\nkeyspace_hits:{self.hits}\r\n'
+                f'keyspace_misses:{self.misses}\r\n').encode()
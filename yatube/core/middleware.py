@@ -0,0 +1,185 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .profiling import StackSampler, collect_phases, phase
+from .routers import read_from_replica
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_LIST = re.compile(r'\((?:%s, )+%s\)')
+
+
+class QueryBudgetExceeded(Exception):
+    """View выполнил больше запросов, чем разрешает QUERY_BUDGETS."""
+
+
+def fingerprint(sql):
+    """Текст запроса без длины списков IN, чтобы N+1 совпадали."""
+    return PLACEHOLDER_LIST.sub('(...)', sql)
+
+
+class QueryRecorder:
+    """Считает запросы и их время через execute_wrapper."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self):
+        return [(sql, count) for sql, count in self.fingerprints.items()
+                if count > settings.QUERY_DUPLICATE_LIMIT]
+
+
+class QueryInspectorMiddleware:
+    """Считает SQL-запросы запроса и ищет повторяющиеся (N+1).
+
+    Итоги отдаются в заголовках X-Query-Count и X-Query-Time-Ms. В строгом
+    режиме (QUERY_BUDGET_STRICT) превышение бюджета view из QUERY_BUDGETS
+    или повторы запросов сверх QUERY_DUPLICATE_LIMIT вызывают ошибку.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        response['X-Query-Count'] = str(recorder.count)
+        response['X-Query-Time-Ms'] = f'{recorder.duration * 1000:.1f}'
+        duplicates = recorder.duplicates()
+        for sql, count in duplicates:
+            logger.warning('%s: запрос выполнен %d раз: %s',
+                           request.path, count, sql)
+        if settings.QUERY_BUDGET_STRICT:
+            self.check_budget(request, recorder, duplicates)
+        return response
+
+    def check_budget(self, request, recorder, duplicates):
+        if duplicates:
+            raise QueryBudgetExceeded(
+                f'{request.path}: повторяющиеся запросы {duplicates}')
+        match = request.resolver_match
+        budget = settings.QUERY_BUDGETS.get(match.view_name if match else '')
+        if budget is not None and recorder.count > budget:
+            raise QueryBudgetExceeded(
+                f'{request.path}: {recorder.count} запросов, '
+                f'бюджет {match.view_name} — {budget}')
+
+
+class ReplicaRoutingMiddleware:
+    """Отправляет чтение представлений из REPLICA_VIEWS на реплики.
+
+    После изменяющего запроса пользователь получает cookie на
+    REPLICA_MAX_LAG секунд и до её истечения читает из основной базы,
+    чтобы сразу видеть свои изменения, даже если реплика отстаёт.
+    Представление вызывается прямо из process_view, поэтому middleware
+    должен стоять в MIDDLEWARE последним.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(settings.REPLICA_STICKY_COOKIE, '1',
+                                max_age=settings.REPLICA_MAX_LAG,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method not in ('GET', 'HEAD')
+                or settings.REPLICA_STICKY_COOKIE in request.COOKIES
+                or request.resolver_match.view_name
+                not in settings.REPLICA_VIEWS):
+            return None
+        with read_from_replica():
+            return view_func(request, *view_args, **view_kwargs)
+
+
+def timed_query(execute, sql, params, many, context):
+    with phase('db'):
+        return execute(sql, params, many, context)
+
+
+class ProfilingMiddleware:
+    """Профилирует долю запросов PROFILING_SAMPLE_RATE.
+
+    Время фаз (view, db, template, thumbnail) уходит в заголовок
+    Server-Timing и в лог; фазы вложены, например template включает
+    запросы из шаблона. Для путей из PROFILING_DUMP_PATTERNS профиль
+    сохраняется в PROFILING_DIR: pstats от cProfile или свёрнутые стеки
+    для flame graph (PROFILING_FORMAT = 'collapsed').
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.dump_patterns = [re.compile(pattern) for pattern
+                              in settings.PROFILING_DUMP_PATTERNS]
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+        dump = any(pattern.search(request.path)
+                   for pattern in self.dump_patterns)
+        with ExitStack() as stack:
+            phases = stack.enter_context(collect_phases())
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timed_query))
+            profiler = None
+            if dump and settings.PROFILING_FORMAT == 'collapsed':
+                profiler = stack.enter_context(
+                    StackSampler(settings.PROFILING_INTERVAL))
+            elif dump:
+                profiler = cProfile.Profile()
+            with phase('view'):
+                if isinstance(profiler, cProfile.Profile):
+                    response = profiler.runcall(self.get_response, request)
+                else:
+                    response = self.get_response(request)
+        timing = ', '.join(f'{name};dur={seconds * 1000:.1f}'
+                           for name, seconds in phases.items())
+        response['Server-Timing'] = timing
+        logger.info('%s: %s', request.path, timing)
+        if profiler is not None:
+            self.dump(request, profiler)
+        return response
+
+    def dump(self, request, profiler):
+        match = request.resolver_match
+        name = (match.view_name if match else 'unknown').replace(':', '-')
+        extension = ('collapsed' if isinstance(profiler, StackSampler)
+                     else 'prof')
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILING_DIR,
+                            f'{name}-{time.time_ns()}.{extension}')
+        if isinstance(profiler, StackSampler):
+            profiler.dump(path)
+        else:
+            profiler.dump_stats(path)
+        logger.info('%s: профиль сохранён в %s', request.path, path)
@@ -0,0 +1,68 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = 'default'
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def current_read_alias():
+    """Реплика, выбранная для чтения в текущем запросе, или None."""
+    return _read_alias.get()
+
+
+def replica_aliases():
+    """Реплики, кроме тестовых зеркал основной базы.
+
+    У зеркала своё соединение, и оно не видит данных из незавершённой
+    транзакции TestCase, поэтому в тестах чтение остаётся в основной базе.
+    """
+    primary = connections[PRIMARY].settings_dict['NAME']
+    return [alias for alias in settings.DATABASE_REPLICAS
+            if connections[alias].settings_dict['NAME'] != primary]
+
+
+@contextmanager
+def read_from_replica():
+    """Направляет чтение внутри блока на случайную реплику.
+
+    Без настроенных реплик блок ничего не меняет.
+    """
+    aliases = replica_aliases()
+    alias = random.choice(aliases) if aliases else None
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """Чтение из реплики там, где это разрешено, запись — в основную базу.
+
+    Реплика выбирается только внутри read_from_replica(), которую
+    включает ReplicaRoutingMiddleware для представлений из REPLICA_VIEWS.
+    Сессии всегда читаются из основной базы, иначе отставшая реплика
+    «разлогинивала» бы пользователя или возвращала удалённую сессию.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in settings.REPLICA_PRIMARY_APPS:
+            return PRIMARY
+        return current_read_alias() or PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
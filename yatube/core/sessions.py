@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+# Ключ сессии -> (момент устаревания по monotonic, сериализованные данные).
+# Память процесса доверенная, поэтому данные здесь без подписи.
+_sessions = OrderedDict()
+_lock = threading.Lock()
+
+
+def remember(session_key, snapshot):
+    with _lock:
+        _sessions[session_key] = (
+            time.monotonic() + settings.SESSION_LOCAL_TIMEOUT, snapshot)
+        _sessions.move_to_end(session_key)
+        while len(_sessions) > settings.SESSION_LOCAL_MAX_ENTRIES:
+            _sessions.popitem(last=False)
+
+
+def recall(session_key):
+    with _lock:
+        expires, snapshot = _sessions.get(session_key, (0, None))
+    return snapshot if expires > time.monotonic() else None
+
+
+def forget(session_key):
+    with _lock:
+        _sessions.pop(session_key, None)
+
+
+def expired_batches(batch_size):
+    """Удаляет истёкшие сессии пачками, отдавая размер каждой пачки.
+
+    Короткие транзакции не держат блокировку SQLite долго, и запросы
+    сайта успевают писать между пачками.
+    """
+    while True:
+        keys = list(Session.objects.filter(
+            expire_date__lt=timezone.now(),
+        ).values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            return
+        Session.objects.filter(session_key__in=keys).delete()
+        yield len(keys)
+
+
+class SessionStore(cached_db.SessionStore):
+    """cached_db с кешем процесса и без записи неизменённых сессий.
+
+    Сессия ищется сначала в памяти процесса (не дольше
+    SESSION_LOCAL_TIMEOUT секунд), затем в общем кеше и только потом в
+    базе. Выход в другом процессе виден здесь с той же задержкой.
+    save() пропускает запись, если данные совпадают с прочитанными,
+    даже когда сессия помечена изменённой.
+    """
+
+    def load(self):
+        snapshot = recall(self.session_key) if self.session_key else None
+        if snapshot is not None:
+            data = self.serializer().loads(snapshot)
+        else:
+            data = super().load()
+            snapshot = self.serializer().dumps(data)
+            if self._session_key is not None:
+                remember(self._session_key, snapshot)
+        self._loaded = snapshot
+        return data
+
+    def save(self, must_create=False):
+        snapshot = self.serializer().dumps(self._get_session(
+            no_load=must_create))
+        if (not must_create and self.session_key is not None
+                and snapshot == getattr(self, '_loaded', None)):
+            return
+        super().save(must_create)
+        self._loaded = snapshot
+        remember(self.session_key, snapshot)
+
+    def delete(self, session_key=None):
+        forget(session_key or self.session_key)
+        super().delete(session_key)
+
+    @classmethod
+    def clear_expired(cls):
+        for _ in expired_batches(settings.SESSION_CLEANUP_BATCH_SIZE):
+            pass
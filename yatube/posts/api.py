@@ -0,0 +1,140 @@
+from urllib.parse import urlencode
+
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from posts.cache import cache_feed
+from posts.conditional import (conditional, feed_validators,
+                               follow_validators, post_validators)
+from posts.feed import (FEED_PAGE_KEY, follow_feed, mark_feed_seen,
+                        unread_count)
+from posts.groups import get_group
+from posts.utils import get_comments_page, get_page
+from .models import Post, User
+
+
+def link(request, **params):
+    return f'{request.path}?{urlencode(params)}'
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'pub_date': post.pub_date.isoformat(),
+        'updated': post.updated.isoformat(),
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+        'url': reverse('posts:post_detail', args=[post.pk]),
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'author_url': reverse('posts:profile',
+                              args=[comment.author.username]),
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def feed_response(request, posts, **page_key):
+    """Страница ленты в JSON со ссылками на соседние страницы."""
+    page_obj = get_page(posts, request, **page_key)['page_obj']
+    if getattr(page_obj, 'is_cursor', False):
+        next_url = (link(request, cursor=page_obj.next_cursor)
+                    if page_obj.has_next() else None)
+        previous_url = (link(request, cursor=page_obj.previous_cursor)
+                        if page_obj.has_previous() else None)
+    else:
+        next_url = (link(request, page=page_obj.next_page_number())
+                    if page_obj.has_next() else None)
+        previous_url = (link(request, page=page_obj.previous_page_number())
+                        if page_obj.has_previous() else None)
+    results = []
+    for post in page_obj:
+        data = serialize_post(post)
+        data['comments_preview'] = [
+            serialize_comment(comment) for comment in post.comment_previews]
+        results.append(data)
+    return JsonResponse({
+        'results': results,
+        'next': next_url,
+        'previous': previous_url,
+    })
+
+
+@conditional(feed_validators('index'))
+@cache_feed('index')
+def index(request):
+    """Главная лента в JSON."""
+    return feed_response(request, Post.objects.for_feed())
+
+
+@conditional(feed_validators('group:{slug}'))
+@cache_feed('group:{slug}')
+def group_posts(request, slug):
+    """Лента группы в JSON."""
+    group = get_group(slug)
+    if group is None:
+        raise Http404
+    return feed_response(request, group.posts.for_feed())
+
+
+@conditional(feed_validators('profile:{username}'))
+@cache_feed('profile:{username}')
+def profile(request, username):
+    """Посты автора в JSON."""
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, author.posts.for_feed())
+
+
+@conditional(post_validators)
+def post_detail(request, post_id):
+    """Пост и первая порция комментариев в JSON."""
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
+    comments = get_comments_page(post)
+    data = serialize_post(post)
+    data['comments'] = [serialize_comment(comment) for comment in comments]
+    data['comments_next'] = (
+        link_to_comments(post_id, comments.next_cursor)
+        if comments.has_next() else None)
+    return JsonResponse(data)
+
+
+@conditional(post_validators)
+def post_comments(request, post_id):
+    """Очередная порция комментариев поста в JSON для «Показать ещё»."""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    page = get_comments_page(post, request.GET.get('cursor'))
+    return JsonResponse({
+        'comments': [serialize_comment(comment) for comment in page],
+        'next': (link_to_comments(post_id, page.next_cursor)
+                 if page.has_next() else ''),
+    })
+
+
+def link_to_comments(post_id, cursor):
+    return '{}?{}'.format(reverse('posts:post_comments', args=[post_id]),
+                          urlencode({'cursor': cursor}))
+
+
+@login_required
+@conditional(follow_validators)
+def follow_index(request):
+    """Лента подписок в JSON."""
+    mark_feed_seen(request.user)
+    return feed_response(request, follow_feed(request.user).for_feed(),
+                         **FEED_PAGE_KEY)
+
+
+@login_required
+def follow_unread(request):
+    """Число новых постов в ленте подписок для значка в шапке."""
+    return JsonResponse({'unread': unread_count(request.user)})
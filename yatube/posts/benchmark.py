@@ -0,0 +1,213 @@
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import (CaptureQueriesContext, setup_databases,
+                               teardown_databases)
+
+from .feed import backfill_feed
+from .models import Comment, Follow, Group, Post
+from .search import rebuild_index
+
+User = get_user_model()
+
+PREFIX = 'benchmark'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@contextmanager
+def rolled_back():
+    """Транзакция, все изменения которой откатываются на выходе."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+@contextmanager
+def isolated(in_place=False):
+    """Окружение прогона, после которого не остаётся данных.
+
+    Данные пишутся во временную тестовую базу, а при in_place — в
+    текущую, в откатываемой транзакции (так прогон запускают тесты,
+    у которых тестовая база уже своя). Кеш свой, в памяти процесса:
+    cache.clear() прогона не чистит общий кеш, и записи по данным
+    прогона в нём не остаются. Файлы — во временном MEDIA_ROOT.
+    """
+    media_root = tempfile.mkdtemp()
+    caches = {
+        alias: dict(config, BACKEND='core.cache.LocMemCache',
+                    LOCATION=f'{PREFIX}-{alias}')
+        for alias, config in settings.CACHES.items()
+    }
+    try:
+        with override_settings(MEDIA_ROOT=media_root, CACHES=caches):
+            if in_place:
+                with rolled_back():
+                    yield
+                return
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                yield
+            finally:
+                teardown_databases(old_config, verbosity=0)
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def seed_dataset(fake, rng, users, groups, posts, comments, follows,
+                 image_share):
+    """Наполняет базу синтетическими данными пачками.
+
+    bulk_create не вызывает сигналы, поэтому счётчики, поисковый индекс
+    и ленты подписок заполняются после вставки так же, как их чинят
+    команды обслуживания.
+    """
+    User.objects.bulk_create(
+        User(username=f'{PREFIX}-{i}', first_name=fake.first_name(),
+             last_name=fake.last_name()) for i in range(users))
+    user_ids = list(User.objects.filter(
+        username__startswith=f'{PREFIX}-').values_list('pk', flat=True))
+    Group.objects.bulk_create(
+        Group(title=fake.sentence(nb_words=3), slug=f'{PREFIX}-{i}',
+              description=fake.text()) for i in range(groups))
+    group_ids = list(Group.objects.filter(
+        slug__startswith=f'{PREFIX}-').values_list('pk', flat=True))
+    image = default_storage.save(f'posts/{PREFIX}.gif',
+                                 ContentFile(SMALL_GIF))
+    Post.objects.bulk_create(
+        (Post(author_id=rng.choice(user_ids),
+              group_id=rng.choice(group_ids + [None]),
+              text=fake.text(),
+              image=image if rng.random() < image_share else '')
+         for _ in range(posts)), batch_size=500)
+    post_ids = list(Post.objects.filter(
+        author__in=user_ids).values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        (Comment(post_id=rng.choice(post_ids),
+                 author_id=rng.choice(user_ids), text=fake.sentence())
+         for _ in range(comments)), batch_size=500)
+    pairs = {(rng.choice(user_ids), rng.choice(user_ids))
+             for _ in range(follows)}
+    Follow.objects.bulk_create(
+        (Follow(user_id=user, author_id=author)
+         for user, author in pairs if user != author),
+        batch_size=500, ignore_conflicts=True)
+    for follow in Follow.objects.filter(
+            user__in=user_ids).select_related('user', 'author'):
+        backfill_feed(follow.user, follow.author)
+    call_command('reconcile_counters', stdout=StringIO())
+    rebuild_index()
+    return {'users': user_ids, 'groups': group_ids, 'posts': post_ids}
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def measure(requests):
+    """Задержки, запросы к БД и пропускная способность набора запросов.
+
+    requests — последовательность функций без аргументов, каждая из
+    которых делает один HTTP-запрос и возвращает ответ.
+    """
+    latencies, queries = [], []
+    started = time.perf_counter()
+    for request in requests:
+        with CaptureQueriesContext(connection) as captured:
+            begin = time.perf_counter()
+            response = request()
+            latencies.append((time.perf_counter() - begin) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f'{response.status_code} от {response.request["PATH_INFO"]}')
+        queries.append(len(captured))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.5), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'queries': round(sum(queries) / len(queries), 2),
+        'rps': round(len(latencies) / elapsed, 1),
+    }
+
+
+def first_byte(request, trace_memory=False):
+    """Время до первого байта и до конца ответа в мс, пик памяти в КБ.
+
+    Потоковый ответ дочитывается до конца, как это сделал бы сервер.
+    Пик памяти считается через tracemalloc, который замедляет запрос,
+    поэтому только при trace_memory.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        response = request()
+        chunks = iter(response.streaming_content if response.streaming
+                      else [response.content])
+        next(chunks, b'')
+        ttfb = time.perf_counter() - started
+        for _ in chunks:
+            pass
+        total = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return ttfb * 1000, total * 1000, peak / 1024
+
+
+def save_results(results, directory):
+    """Сохраняет прогон в JSON с отметкой времени в имени файла."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, time.strftime('%Y%m%d-%H%M%S.json'))
+    with open(path, 'w') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+    return path
+
+
+def latest_results(directory):
+    """Путь к последнему сохранённому прогону или None."""
+    if not os.path.isdir(directory):
+        return None
+    runs = sorted(name for name in os.listdir(directory)
+                  if name.endswith('.json'))
+    return os.path.join(directory, runs[-1]) if runs else None
+
+
+def regressions(current, baseline, threshold):
+    """Замедления p95 сверх порога и рост числа запросов к БД."""
+    found = []
+    for view, stats in current['views'].items():
+        old = baseline['views'].get(view)
+        if old is None:
+            continue
+        if stats['p95_ms'] > old['p95_ms'] * (1 + threshold):
+            found.append(f'{view}: p95 {old["p95_ms"]} → {stats["p95_ms"]} мс')
+        if stats['queries'] > old['queries']:
+            found.append(
+                f'{view}: запросов {old["queries"]} → {stats["queries"]}')
+    return found
@@ -0,0 +1,165 @@
+import hashlib
+import math
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core.routers import current_read_alias
+
+SITE_SCOPE = 'site'
+FEED_REBUILD_POLL = 0.05
+
+
+def _generation_key(scope):
+    return f'generation:{scope}'
+
+
+def get_generations(scopes):
+    """Текущие поколения областей кеша, отсутствующие создаются."""
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+    return [found.get(key) or missing[key] for key in keys]
+
+
+def bump_generation(*scopes):
+    """Делает устаревшими страницы, закешированные в этих областях."""
+    now = time.time_ns()
+    cache.set_many({_generation_key(scope): now for scope in scopes}, None)
+
+
+def post_scopes(post):
+    """Области кеша страниц, на которых показан пост."""
+    scopes = ['index', f'profile:{post.author.username}']
+    if post.group_id:
+        scopes.append(f'group:{post.group.slug}')
+    return scopes
+
+
+def scope_names(scopes, kwargs):
+    """Общая область сайта и области страницы с подставленными аргументами."""
+    return [SITE_SCOPE] + [scope.format(**kwargs) for scope in scopes]
+
+
+def early_expired(expires, delta, now):
+    """Вероятностное раннее истечение (XFetch).
+
+    Чем ближе срок и чем дольше пересборка (delta), тем вероятнее, что
+    запрос пересоберёт страницу заранее — до того, как её одновременно
+    хватятся все.
+    """
+    beta = settings.FEED_EARLY_EXPIRATION_BETA
+    return now - delta * beta * math.log(1 - random.random()) >= expires
+
+
+def cached_page(key, generations, timeout, build):
+    """Страница из кеша с пересборкой одним запросом (single flight).
+
+    Запись хранит ответ, поколения областей, логический срок и время
+    пересборки, а в кеше живёт ещё FEED_STALE_TIMEOUT после срока.
+    Устаревшую запись пересобирает тот, кто взял блокировку; остальные
+    тем временем получают прежнюю страницу с пометкой stale. Если
+    прежней нет, они ждут новую не дольше FEED_REBUILD_LOCK_TIMEOUT.
+    """
+    entry = cache.get(key)
+    if entry is not None and entry['generations'] == generations \
+            and not early_expired(entry['expires'], entry['delta'],
+                                  time.time()):
+        return entry['response']
+    lock = f'{key}:rebuild'
+    locked = cache.add(lock, 1, settings.FEED_REBUILD_LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            response = entry['response']
+            # Страница прежних поколений: валидаторы, посчитанные по
+            # текущим, ей не подходят, см. conditional.
+            response.stale = entry['generations'] != generations
+            return response
+        deadline = time.monotonic() + settings.FEED_REBUILD_LOCK_TIMEOUT
+        while time.monotonic() < deadline and cache.has_key(lock):
+            time.sleep(FEED_REBUILD_POLL)
+            entry = cache.get(key)
+            if entry is not None and entry['generations'] == generations:
+                return entry['response']
+    try:
+        started = time.time()
+        response = build()
+        if cacheable(response):
+            if response.streaming:
+                # Потоковая страница сохраняется, когда отправлена целиком;
+                # до этого блокировку держит её генератор.
+                response.streaming_content = store_streamed(
+                    response.streaming_content, response, key, generations,
+                    timeout, started, lock if locked else None)
+                locked = False
+            else:
+                store_page(key, response, generations, timeout, started)
+        return response
+    finally:
+        if locked:
+            cache.delete(lock)
+
+
+def store_page(key, response, generations, timeout, started):
+    finished = time.time()
+    cache.set(key, {
+        'response': response,
+        'generations': generations,
+        'expires': finished + timeout,
+        'delta': finished - started,
+    }, timeout + settings.FEED_STALE_TIMEOUT)
+
+
+def store_streamed(chunks, response, key, generations, timeout, started,
+                   lock):
+    """Отдаёт части потокового ответа и кеширует собранную страницу."""
+    sent = []
+    try:
+        for chunk in chunks:
+            sent.append(chunk)
+            yield chunk
+        page = HttpResponse(b''.join(sent),
+                            content_type=response['Content-Type'])
+        store_page(key, page, generations, timeout, started)
+    finally:
+        if lock is not None:
+            cache.delete(lock)
+
+
+def cacheable(response):
+    return response.status_code == 200 and not response.cookies
+
+
+def cache_feed(*scopes):
+    """Кеширует страницу до изменения данных в её областях.
+
+    Области заполняются именованными аргументами view, например
+    'group:{slug}'. Изменение данных меняет поколение области, и запись
+    страницы устаревает, поэтому срок жизни кеша может быть долгим.
+    Шапка страницы зависит от пользователя, поэтому ключ включает его id.
+    Страница, собранная по данным реплики, могла отстать от поколения,
+    поэтому живёт в кеше не дольше REPLICA_MAX_LAG. Пересборку после
+    смены поколения или срока выполняет один запрос, см. cached_page.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            generations = get_generations(scope_names(scopes, kwargs))
+            url = hashlib.md5(
+                request.build_absolute_uri().encode()).hexdigest()
+            key = f'feed:{request.user.pk or 0}:{url}'
+            timeout = (settings.REPLICA_MAX_LAG if current_read_alias()
+                       else settings.FEED_CACHE_TIMEOUT)
+            return cached_page(
+                key, generations, timeout,
+                lambda: view_func(request, *args, **kwargs))
+        return wrapper
+    return decorator
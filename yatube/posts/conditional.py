@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.db.models import Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .cache import SITE_SCOPE, get_generations, scope_names
+from .feed import follow_scope, heavy_authors
+from .models import Post
+
+
+def conditional(validators):
+    """Условный GET: validators(request, **kwargs) даёт ETag и Last-Modified.
+
+    Валидаторы считаются до view, поэтому на ответ 304 не тратятся ни
+    запросы страницы, ни рендеринг. ETag включает id пользователя:
+    шапка страницы у каждого своя. max-age=0 заставляет клиентов не
+    держать страницу у себя, а перепроверять её. Прежняя страница,
+    отданная из кеша во время пересборки (stale), уходит без
+    валидаторов: иначе клиент получил бы на неё 304 и после пересборки.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            etag, last_modified = validators(request, *args, **kwargs)
+            if etag is not None:
+                etag = f'{request.user.pk or 0}.{etag}'
+            response = condition(
+                etag_func=lambda *args, **kwargs: etag,
+                last_modified_func=lambda *args, **kwargs: last_modified,
+            )(view_func)(request, *args, **kwargs)
+            if getattr(response, 'stale', False):
+                del response['ETag']
+                del response['Last-Modified']
+            patch_cache_control(response, max_age=0)
+            return response
+        return wrapper
+    return decorator
+
+
+def from_generation(generation):
+    return datetime.fromtimestamp(generation / 10 ** 9, timezone.utc)
+
+
+def feed_validators(*scopes):
+    """Валидаторы лент по поколениям областей кеша, без запросов к базе.
+
+    Поколение меняется при любом изменении данных области, включая
+    правки и удаления, которых не видно по самой свежей pub_date.
+    """
+    def validators(request, *args, **kwargs):
+        generations = get_generations(scope_names(scopes, kwargs))
+        return ('.'.join(map(str, generations)),
+                from_generation(max(generations)))
+    return validators
+
+
+def post_validators(request, post_id, **kwargs):
+    """Валидаторы поста одним запросом: правка, комментарии и счётчики."""
+    row = Post.objects.filter(pk=post_id).order_by().annotate(
+        last_comment=Max('comments__created'),
+    ).values_list('updated', 'last_comment', 'comments_count',
+                  'author__stats__posts_count',
+                  'author__stats__followers_count').first()
+    if row is None:
+        return None, None
+    updated, last_comment, *counters = row
+    site, = get_generations([SITE_SCOPE])
+    last_modified = max(updated, last_comment or updated,
+                        from_generation(site))
+    etag = '.'.join(str(value) for value in (
+        post_id, updated.timestamp(), *counters, site))
+    return etag, last_modified
+
+
+def follow_validators(request, **kwargs):
+    """Валидаторы ленты подписок по поколениям, без чтения самой ленты.
+
+    Поколение ленты пользователя меняется при раскладке в неё постов,
+    их правке и при подписках. Посты «тяжёлых» авторов не раскладываются,
+    поэтому к нему добавляются поколения их профилей.
+    """
+    if not request.user.is_authenticated:
+        return None, None
+    heavy = heavy_authors(request.user).values_list(
+        'user__username', flat=True)
+    generations = get_generations(
+        [SITE_SCOPE, follow_scope(request.user.pk)]
+        + [f'profile:{username}' for username in heavy])
+    return ('.'.join(map(str, generations)),
+            from_generation(max(generations)))
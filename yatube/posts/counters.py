@@ -0,0 +1,44 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import F
+
+from .models import AuthorStats, Follow, Post
+
+
+def reconcile_author(user_id):
+    """Пересчитывает счётчики автора по фактическим данным."""
+    stats, _ = AuthorStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=user_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=user_id).count(),
+        },
+    )
+    return stats
+
+
+def get_author_stats(user):
+    try:
+        return user.stats
+    except ObjectDoesNotExist:
+        return reconcile_author(user.pk)
+
+
+def change_author_counter(user_id, field, delta):
+    """Атомарно меняет счётчик автора на delta.
+
+    Если строки счётчиков ещё нет, она создаётся пересчётом. При удалении
+    её отсутствие значит, что автор удаляется сам. Разошедшийся с данными
+    счётчик (например, после bulk_create) не уходит ниже нуля.
+    """
+    rows = AuthorStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    updated = rows.update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        reconcile_author(user_id)
+
+
+def change_comments_counter(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta)
@@ -0,0 +1,270 @@
+from collections import defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Subquery
+from django.utils import timezone
+
+from .cache import bump_generation
+from .models import AuthorStats, FeedEntry, Follow, Post
+
+
+# Поля ключа страницы ленты подписок, см. follow_feed.
+FEED_PAGE_KEY = {'date_field': 'feed_date', 'key_field': 'feed_entry'}
+
+
+def follow_scope(user_id):
+    """Область кеша ленты подписок пользователя."""
+    return f'follow:{user_id}'
+
+
+def bump_follow_feeds(user_ids):
+    bump_generation(*(follow_scope(user_id) for user_id in user_ids))
+
+
+def is_heavy_author(author):
+    """Автор со слишком большим числом подписчиков для рассылки."""
+    return AuthorStats.objects.filter(
+        user=author, followers_count__gt=settings.FEED_FANOUT_LIMIT).exists()
+
+
+def heavy_authors(user):
+    """Авторы из подписок пользователя, чьи посты читаются напрямую."""
+    return AuthorStats.objects.filter(
+        user__following__user=user,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).values('user')
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    if is_heavy_author(post.author):
+        return
+    followers = list(Follow.objects.filter(
+        author=post.author).values_list('user', flat=True))
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers],
+        ignore_conflicts=True,
+    )
+    bump_follow_feeds(followers)
+
+
+def refresh_follow_feeds(post):
+    """Меняет поколения лент, куда разложен изменённый пост.
+
+    Посты «тяжёлых» авторов не раскладываются: их изменения видны по
+    поколению профиля автора, см. follow_validators.
+    """
+    bump_follow_feeds(Follow.objects.filter(
+        author=post.author_id,
+        author__stats__followers_count__lte=settings.FEED_FANOUT_LIMIT,
+    ).values_list('user', flat=True))
+
+
+def fan_out_posts(posts):
+    """Раскладывает пачку постов в ленты подписчиков за два запроса."""
+    authors = {post.author_id for post in posts}
+    heavy = set(AuthorStats.objects.filter(
+        user__in=authors, followers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).values_list('user', flat=True))
+    followers = defaultdict(list)
+    for author, user in Follow.objects.filter(
+            author__in=authors - heavy).values_list('author', 'user'):
+        followers[author].append(user)
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post_id=post.pk, pub_date=post.pub_date)
+         for post in posts for user_id in followers[post.author_id]],
+        ignore_conflicts=True,
+    )
+    bump_follow_feeds({user_id for post in posts
+                       for user_id in followers[post.author_id]})
+
+
+def backfill_feed(user, author):
+    """Добавляет в ленту свежие посты автора после подписки.
+
+    Посты «тяжёлого» автора тоже: дальше их дописывает pull_heavy_posts.
+    """
+    posts = Post.objects.filter(author=author).values_list(
+        'pk', 'pub_date')[:settings.FEED_MAX_LENGTH]
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user=user, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts],
+        ignore_conflicts=True,
+    )
+    trim_feed(user)
+    bump_follow_feeds([getattr(user, 'pk', user)])
+
+
+def backfill_follows(follows):
+    """backfill_feed для пачки подписок без сигналов, одной вставкой.
+
+    Каждому подписчику достаются не больше FEED_MAX_LENGTH самых свежих
+    постов его новых авторов; переполненные ленты затем обрезаются.
+    """
+    authors = {follow.author_id for follow in follows}
+    recent = defaultdict(list)
+    posts = Post.objects.filter(author__in=authors).order_by(
+        'author', '-pub_date').values_list('author', 'pk', 'pub_date')
+    for author_id, post_id, pub_date in posts.iterator():
+        if len(recent[author_id]) < settings.FEED_MAX_LENGTH:
+            recent[author_id].append((post_id, pub_date))
+    feeds = defaultdict(list)
+    for follow in follows:
+        feeds[follow.user_id] += recent[follow.author_id]
+    entries = []
+    for user_id, posts in feeds.items():
+        posts.sort(key=itemgetter(1), reverse=True)
+        entries += [FeedEntry(user_id=user_id, post_id=post_id,
+                              pub_date=pub_date)
+                    for post_id, pub_date in posts[:settings.FEED_MAX_LENGTH]]
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    overfull = FeedEntry.objects.filter(user__in=list(feeds)).values(
+        'user').annotate(total=Count('pk')).filter(
+        total__gt=settings.FEED_MAX_LENGTH).values_list('user', flat=True)
+    for user_id in overfull:
+        trim_feed(user_id)
+    bump_follow_feeds(feeds)
+
+
+def backfill_followers(author, since):
+    """Раскладывает подписчикам посты автора, опубликованные с since.
+
+    Нужна, когда автор перестаёт быть «тяжёлым»: его посты за это время
+    не раскладывались, а забирались при чтении лент. Записи создаются
+    пачками не больше FEED_BACKFILL_BATCH_SIZE.
+    """
+    posts = list(Post.objects.filter(
+        author=author, pub_date__gte=since,
+    ).values_list('pk', 'pub_date')[:settings.FEED_MAX_LENGTH])
+    if not posts:
+        return
+    followers = Follow.objects.filter(author=author).values_list(
+        'user', flat=True)
+    chunk = max(1, settings.FEED_BACKFILL_BATCH_SIZE // len(posts))
+    user_ids = []
+    for user_id in followers.iterator():
+        user_ids.append(user_id)
+        if len(user_ids) >= chunk:
+            _add_entries(user_ids, posts)
+            bump_follow_feeds(user_ids)
+            user_ids = []
+    if user_ids:
+        _add_entries(user_ids, posts)
+        bump_follow_feeds(user_ids)
+
+
+def _add_entries(user_ids, posts):
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for user_id in user_ids for post_id, pub_date in posts],
+        ignore_conflicts=True,
+    )
+
+
+def update_heavy_since(author_id):
+    """Отмечает, с какого момента автор «тяжёлый».
+
+    Когда подписчиков снова не больше FEED_FANOUT_LIMIT, посты за это
+    время раскладываются в ленты тех, кто их ещё не забрал.
+    """
+    row = AuthorStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', 'heavy_since').first()
+    if row is None:
+        return
+    followers_count, heavy_since = row
+    heavy = followers_count > settings.FEED_FANOUT_LIMIT
+    if heavy and heavy_since is None:
+        AuthorStats.objects.filter(user_id=author_id).update(
+            heavy_since=timezone.now())
+    elif not heavy and heavy_since is not None:
+        AuthorStats.objects.filter(user_id=author_id).update(
+            heavy_since=None)
+        backfill_followers(author_id, heavy_since)
+
+
+def remove_author_from_feed(user, author):
+    """Убирает из ленты посты автора после отписки."""
+    FeedEntry.objects.filter(user=user, post__author=author).delete()
+    bump_follow_feeds([getattr(user, 'pk', user)])
+
+
+def trim_feed(user):
+    """Оставляет в ленте не больше FEED_MAX_LENGTH свежих записей."""
+    stale = FeedEntry.objects.filter(user=user).order_by(
+        '-pub_date').values_list('pk', flat=True)[settings.FEED_MAX_LENGTH:]
+    FeedEntry.objects.filter(pk__in=list(stale)).delete()
+
+
+def pull_heavy_posts(user):
+    """Дописывает в ленту новые посты «тяжёлых» авторов из подписок.
+
+    Их посты не раскладываются при публикации, а забираются при чтении
+    ленты: опубликованные после последнего забранного поста (ключ
+    feed_pulled, feed_pulled_post), по индексу автора и даты. Если новых
+    постов нет, это один запрос на чтение, без записи.
+    """
+    stats = AuthorStats.objects.filter(user=user)
+    posts = list(Post.objects.filter(
+        author__in=heavy_authors(user),
+    ).annotate(
+        pulled=Subquery(stats.values('feed_pulled')[:1]),
+        pulled_post=Subquery(stats.values('feed_pulled_post')[:1]),
+    ).filter(
+        Q(pulled__isnull=True)
+        | Q(pub_date__gt=F('pulled'))
+        | Q(pub_date=F('pulled'), pk__gt=F('pulled_post'))
+    ).order_by('-pub_date', '-pk').values_list(
+        'pk', 'pub_date')[:settings.FEED_MAX_LENGTH])
+    if not posts:
+        return
+    _add_entries([user.pk], posts)
+    stats.update(feed_pulled=posts[0][1], feed_pulled_post=posts[0][0])
+    trim_feed(user)
+
+
+def follow_feed(user):
+    """Лента подписок из записей пользователя по индексу (user, pub_date).
+
+    Посты аннотированы датой и id записи ленты: это ключ страницы
+    (FEED_PAGE_KEY для get_page). Индекс (user, pub_date) в SQLite
+    хранит и id записи, поэтому страница читается по индексу, не
+    сортируя всю ленту, и её цена не растёт с длиной ленты.
+    """
+    pull_heavy_posts(user)
+    return Post.objects.filter(feed_entries__user=user).annotate(
+        feed_date=F('feed_entries__pub_date'),
+        feed_entry=F('feed_entries__pk'),
+    ).order_by('-feed_date', '-feed_entry')
+
+
+def mark_unread(post):
+    """Добавляет новый пост к счётчикам непрочитанного подписчиков.
+
+    Один UPDATE по подпискам автора — и для «тяжёлых» авторов, чьи
+    посты в ленты не раскладываются.
+    """
+    AuthorStats.objects.filter(user__follower__author=post.author_id).update(
+        unread_count=F('unread_count') + 1)
+
+
+def forget_unread(post):
+    """Убирает удалённый пост из счётчиков тех, кто его ещё не видел."""
+    AuthorStats.objects.filter(
+        Q(feed_seen__isnull=True) | Q(feed_seen__lt=post.pub_date),
+        user__follower__author=post.author_id,
+        unread_count__gt=0,
+    ).update(unread_count=F('unread_count') - 1)
+
+
+def mark_feed_seen(user):
+    """Сдвигает отметку просмотра ленты и обнуляет счётчик новых постов."""
+    AuthorStats.objects.filter(user=user).update(
+        unread_count=0, feed_seen=timezone.now())
+
+
+def unread_count(user):
+    """Число новых постов в ленте с последнего просмотра, без COUNT(*)."""
+    return AuthorStats.objects.filter(user=user).values_list(
+        'unread_count', flat=True).first() or 0
@@ -1,7 +1,9 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 from django import forms
 
 from .models import Post, Comment
+from .uploads import check_image, process_image
 
 
 class PostForm(ModelForm):
@@ -16,6 +18,20 @@ class PostForm(ModelForm):
             'text': forms.Textarea(attrs={'cols': 50, 'rows': 10})
         }
 
+    def clean_image(self):
+        """Новая картинка проверяется, но сохраняется только в save()."""
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            check_image(image)
+        return image
+
+    def save(self, commit=True):
+        """Сохраняет новую картинку под хешем, когда форма уже проверена."""
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            self.instance.image = process_image(image)
+        return super().save(commit)
+
 
 class CommentForm(ModelForm):
     class Meta:
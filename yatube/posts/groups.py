@@ -0,0 +1,68 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery
+
+from .cache import get_generations
+from .models import Group, Post
+
+GROUPS_SCOPE = 'groups'
+DIRECTORY_KEY = 'groups_directory'
+
+_groups = {}
+_generation = None
+_lock = threading.Lock()
+
+
+def get_group(slug):
+    """Группа по slug из кеша процесса или None, если её нет.
+
+    Группы меняются редко, поэтому хранятся в памяти процесса. Сигналы
+    очищают кеш своего процесса сразу, а остальные процессы замечают
+    смену поколения области groups в общем кеше.
+    """
+    global _generation
+    generation, = get_generations([GROUPS_SCOPE])
+    with _lock:
+        if generation != _generation:
+            _groups.clear()
+            _generation = generation
+        group = _groups.get(slug)
+    if group is None:
+        group = Group.objects.filter(slug=slug).first()
+        if group is not None:
+            with _lock:
+                if generation == _generation:
+                    _groups[slug] = group
+    return group
+
+
+def forget_groups():
+    """Очищает кеш групп текущего процесса."""
+    with _lock:
+        _groups.clear()
+
+
+def groups_directory():
+    """Группы с числом постов и последним постом.
+
+    Агрегат пересчитывается не чаще раза в GROUPS_DIRECTORY_TIMEOUT:
+    точность до минут каталогу не нужна.
+    """
+    return cache.get_or_set(DIRECTORY_KEY, _build_directory,
+                            settings.GROUPS_DIRECTORY_TIMEOUT)
+
+
+def _build_directory():
+    latest = Post.objects.filter(group=OuterRef('pk')).order_by(
+        '-pub_date', '-pk').values('pk')[:1]
+    groups = list(Group.objects.annotate(
+        posts_total=Count('posts'),
+        latest_post_id=Subquery(latest),
+    ).order_by('title'))
+    posts = Post.objects.select_related('author').in_bulk(
+        [group.latest_post_id for group in groups if group.latest_post_id])
+    for group in groups:
+        group.latest_post = posts.get(group.latest_post_id)
+    return groups
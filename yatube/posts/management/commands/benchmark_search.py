@@ -0,0 +1,59 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from faker import Faker
+
+from posts.benchmark import rolled_back
+from posts.models import Post
+from posts.search import rebuild_index, search_post_ids
+
+User = get_user_model()
+
+
+def timed(func, repeat):
+    """Среднее время вызова func в миллисекундах."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск по индексу FTS5 с icontains на '
+            'сгенерированном корпусе; корпус затем откатывается.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=20000,
+                            help='Размер корпуса.')
+        parser.add_argument('--queries', type=int, default=20,
+                            help='Число случайных запросов.')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Повторов каждого запроса.')
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.benchmark(**options)
+
+    def benchmark(self, posts, queries, repeat, **options):
+        fake = Faker('ru_RU')
+        Faker.seed(0)
+        author = User.objects.create(username='benchmark_search')
+        Post.objects.bulk_create(
+            (Post(author=author, text=fake.text()) for _ in range(posts)),
+            batch_size=500)
+        rebuild_index()
+        words = [fake.word() for _ in range(queries)]
+        self.stdout.write(f'Постов: {posts}, запросов: {queries}')
+        self.report('Частые слова', words, repeat)
+        self.report('Нет совпадений', ['отсутствующееслово'], repeat)
+
+    def report(self, title, words, repeat):
+        """Выводит среднее время поиска по индексу и через icontains."""
+        fts = sum(timed(lambda: search_post_ids(word, 0, 10), repeat)
+                  for word in words) / len(words)
+        icontains = sum(timed(lambda: list(Post.objects.filter(
+            text__icontains=word).values_list('pk', flat=True)[:10]), repeat)
+            for word in words) / len(words)
+        self.stdout.write(
+            f'{title}: FTS5 {fts:.2f} мс, icontains {icontains:.2f} мс')
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.benchmark import isolated, measure
+from posts.models import Post
+
+User = get_user_model()
+
+ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+    'core.sessions',
+    'django.contrib.sessions.backends.signed_cookies',
+)
+
+
+class Command(BaseCommand):
+    help = ('Задержка главной страницы для вошедшего пользователя при '
+            'разных хранилищах сессий; страница берётся из кеша, поэтому '
+            'видна стоимость сессии и пользователя.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--in-place', action='store_true',
+                            help='Прогон в текущей базе с откатом вместо '
+                                 'временной тестовой базы.')
+
+    def handle(self, *args, **options):
+        with isolated(options['in_place']):
+            user = User.objects.create(username='benchmark-sessions')
+            for i in range(20):
+                Post.objects.create(author=user, text=f'Пост {i}')
+            for engine in ENGINES:
+                with override_settings(SESSION_ENGINE=engine):
+                    self.report(engine, user, options['requests'])
+
+    def report(self, engine, user, count):
+        cache.clear()
+        client = Client()
+        client.force_login(user)
+        url = reverse('posts:index')
+        client.get(url)
+        stats = measure([lambda: client.get(url)] * count)
+        self.stdout.write(
+            f'{engine:48} p50 {stats["p50_ms"]:6.2f}  '
+            f'p95 {stats["p95_ms"]:6.2f} мс  '
+            f'запросов {stats["queries"]:4}  {stats["rps"]:7.1f} rps')
@@ -0,0 +1,56 @@
+import random
+import statistics
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+from faker import Faker
+
+from posts.benchmark import first_byte, isolated, seed_dataset
+
+
+class Command(BaseCommand):
+    help = ('Время до первого байта, полное время и пик памяти лент при '
+            'обычном и потоковом рендеринге для разных POSTS_COUNT.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--page-sizes', type=int, nargs='+',
+                            default=[10, 100, 500])
+        parser.add_argument('--requests', type=int, default=20,
+                            help='Запросов на каждую комбинацию.')
+        parser.add_argument('--image-share', type=float, default=0.3)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--in-place', action='store_true',
+                            help='Прогон в текущей базе с откатом вместо '
+                                 'временной тестовой базы.')
+
+    def handle(self, *args, **options):
+        with isolated(options['in_place']):
+            Faker.seed(options['seed'])
+            seed_dataset(Faker('ru_RU'), random.Random(options['seed']),
+                         users=20, groups=5, posts=options['posts'],
+                         comments=options['posts'], follows=50,
+                         image_share=options['image_share'])
+            for size in options['page_sizes']:
+                for streaming in (False, True):
+                    self.report(size, streaming, options['requests'])
+
+    def report(self, size, streaming, count):
+        client = Client()
+        url = reverse('posts:index')
+
+        def request():
+            cache.clear()
+            return client.get(url)
+
+        with override_settings(POSTS_COUNT=size, FEED_STREAMING=streaming):
+            runs = [first_byte(request) for _ in range(count)]
+            peak = first_byte(request, trace_memory=True)[2]
+        mode = 'поток' if streaming else 'render'
+        self.stdout.write(
+            f'POSTS_COUNT {size:5}  {mode:6}  '
+            f'TTFB {statistics.median(run[0] for run in runs):8.2f} мс  '
+            f'всего {statistics.median(run[1] for run in runs):8.2f} мс  '
+            f'пик памяти {peak:9.1f} КБ')
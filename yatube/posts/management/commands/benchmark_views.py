@@ -0,0 +1,124 @@
+import json
+import random
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from faker import Faker
+
+from posts.benchmark import (isolated, latest_results, measure,
+                             regressions, save_results, seed_dataset)
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон представлений posts на синтетических '
+            'данных: p50/p95/p99, запросы к БД и запросы в секунду.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=500)
+        parser.add_argument('--image-share', type=float, default=0.3,
+                            help='Доля постов с картинкой.')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов к каждому представлению.')
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default=settings.BENCHMARK_DIR,
+                            help='Каталог для результатов прогонов.')
+        parser.add_argument('--compare', default=None,
+                            help='Файл прогона для сравнения; по умолчанию '
+                                 'последний в каталоге результатов.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимый рост p95, доля.')
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--in-place', action='store_true',
+                            help='Прогон в текущей базе с откатом вместо '
+                                 'временной тестовой базы.')
+
+    def handle(self, *args, **options):
+        baseline_path = options['compare'] or latest_results(
+            options['output'])
+        with isolated(options['in_place']):
+            results = self.benchmark(options)
+        for view, stats in results['views'].items():
+            self.stdout.write(
+                f'{view:20} p50 {stats["p50_ms"]:8.2f}  '
+                f'p95 {stats["p95_ms"]:8.2f}  p99 {stats["p99_ms"]:8.2f} мс  '
+                f'запросов {stats["queries"]:5}  {stats["rps"]:8.1f} rps')
+        path = save_results(results, options['output'])
+        self.stdout.write(f'Результаты сохранены в {path}')
+        if baseline_path is None:
+            return
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+        if any(baseline.get(key) != results[key]
+               for key in ('dataset', 'requests', 'cold')):
+            self.stdout.write(self.style.WARNING(
+                f'{baseline_path}: другие параметры прогона, '
+                'сравнение неточно'))
+        found = regressions(results, baseline, options['threshold'])
+        for line in found:
+            self.stdout.write(self.style.WARNING(line))
+        if found and options['fail_on_regression']:
+            raise CommandError(f'Регрессии относительно {baseline_path}')
+
+    def benchmark(self, options):
+        rng = random.Random(options['seed'])
+        fake = Faker('ru_RU')
+        Faker.seed(options['seed'])
+        dataset = {name: options[name] for name in (
+            'users', 'groups', 'posts', 'comments', 'follows',
+            'image_share')}
+        ids = seed_dataset(fake, rng, **dataset)
+        groups = list(Group.objects.filter(
+            pk__in=ids['groups']).values_list('slug', flat=True))
+        usernames = list(User.objects.filter(
+            pk__in=ids['users']).values_list('username', flat=True))
+        client = Client()
+        client.force_login(User.objects.get(pk=rng.choice(ids['users'])))
+        cache.clear()
+
+        def get(url):
+            def request():
+                if options['cold']:
+                    cache.clear()
+                return client.get(url)
+            return request
+
+        def post(url, data):
+            return lambda: client.post(url, data)
+
+        count = options['requests']
+        scenarios = {
+            'index': lambda: get(reverse('posts:index')),
+            'group_posts': lambda: get(reverse(
+                'posts:group_list', args=[rng.choice(groups)])),
+            'profile': lambda: get(reverse(
+                'posts:profile', args=[rng.choice(usernames)])),
+            'post_detail': lambda: get(reverse(
+                'posts:post_detail', args=[rng.choice(ids['posts'])])),
+            'follow_index': lambda: get(reverse('posts:follow_index')),
+            'post_create': lambda: post(reverse('posts:post_create'),
+                                        {'text': fake.text()}),
+            'add_comment': lambda: post(reverse(
+                'posts:add_comment', args=[rng.choice(ids['posts'])]),
+                {'text': fake.sentence()}),
+        }
+        views = {name: measure([make() for _ in range(count)])
+                 for name, make in scenarios.items()}
+        return {
+            'dataset': dict(dataset, posts_total=Post.objects.count()),
+            'requests': count,
+            'cold': options['cold'],
+            'views': views,
+        }
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.cache import LocalRedisServer
+
+
+class Command(BaseCommand):
+    help = ('Запускает локальный сервер кеша с протоколом Redis — замена '
+            'Redis для разработки: YATUBE_CACHE=redis://127.0.0.1:6379/0.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=6379)
+
+    def handle(self, *args, **options):
+        server = LocalRedisServer(options['host'], options['port']).start()
+        self.stdout.write(f'Сервер кеша: {server.url}')
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.stop()
@@ -0,0 +1,13 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Печатает попадания и промахи кеша; для общего кеша на Redis — '
+            'общие для всех процессов счётчики сервера.')
+
+    def handle(self, *args, **options):
+        if not hasattr(cache, 'metrics'):
+            raise CommandError('Бэкенд кеша не ведёт счётчики')
+        for name, value in cache.metrics().items():
+            self.stdout.write(f'{name}: {value}')
@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sessions import expired_batches
+
+
+class Command(BaseCommand):
+    help = 'Удаляет истёкшие сессии из базы пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.SESSION_CLEANUP_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Пауза между пачками, секунд.')
+
+    def handle(self, *args, **options):
+        deleted = 0
+        for count in expired_batches(options['batch_size']):
+            deleted += count
+            time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено истёкших сессий: {deleted}'))
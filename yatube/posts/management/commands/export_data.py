@@ -0,0 +1,44 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import (COLUMNS, FORMATS, detect_format, export_rows,
+                            write_rows)
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии или подписки в JSON Lines '
+            'или CSV потоком, не загружая таблицу в память.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(COLUMNS))
+        parser.add_argument('path', help='Файл; «-» — стандартный вывод.')
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='По умолчанию по расширению файла.')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Строк, читаемых из базы за раз.')
+
+    def handle(self, *args, kind, path, batch_size, **options):
+        fmt = detect_format(path, options['format'])
+        started = time.monotonic()
+        rows = self.progress(export_rows(kind, batch_size), batch_size,
+                             started)
+        if path == '-':
+            written = write_rows(sys.stdout, fmt, kind, rows)
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as file:
+                written = write_rows(file, fmt, kind, rows)
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено: {written} за {elapsed:.1f} с '
+            f'({written / max(elapsed, 1e-9):.0f} строк/с)'))
+
+    def progress(self, rows, every, started):
+        """Пропускает строки насквозь, сообщая о ходе в stderr."""
+        for number, row in enumerate(rows, 1):
+            if number % every == 0:
+                elapsed = time.monotonic() - started
+                self.stderr.write(
+                    f'{number} строк, {number / elapsed:.0f} строк/с')
+            yield row
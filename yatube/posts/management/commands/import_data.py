@@ -0,0 +1,77 @@
+import sys
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from posts.cache import SITE_SCOPE, bump_generation
+from posts.search import rebuild_index
+from posts.transfer import (COLUMNS, FORMATS, batches, detect_format,
+                            import_batch, read_rows)
+
+
+class Command(BaseCommand):
+    help = ('Загружает группы, посты, комментарии или подписки из JSON '
+            'Lines или CSV пачками bulk_create. Уже загруженные строки '
+            'пропускаются, поэтому загрузку можно повторить. Строки, чей id '
+            'занят в базе другими данными, не загружаются: их id выводятся, '
+            'а команда завершается ошибкой.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(COLUMNS))
+        parser.add_argument('path', help='Файл; «-» — стандартный ввод.')
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='По умолчанию по расширению файла.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Строк в одной вставке.')
+
+    def handle(self, *args, kind, path, batch_size, **options):
+        fmt = detect_format(path, options['format'])
+        if path == '-':
+            conflicts = self.load(kind, sys.stdin, fmt, batch_size)
+        else:
+            with open(path, newline='', encoding='utf-8') as file:
+                conflicts = self.load(kind, file, fmt, batch_size)
+        self.finish(kind)
+        if conflicts:
+            raise CommandError(
+                f'Не загружено строк с занятым id: {conflicts}')
+
+    def load(self, kind, file, fmt, batch_size):
+        """Загружает файл пачками и возвращает число конфликтов."""
+        started = time.monotonic()
+        total = inserted = conflicts = 0
+        for batch in batches(read_rows(file, fmt), batch_size):
+            with transaction.atomic():
+                added, taken = import_batch(kind, batch)
+            total += len(batch)
+            inserted += added
+            conflicts += len(taken)
+            if taken:
+                self.stderr.write(self.style.WARNING(
+                    f'id заняты другими данными: '
+                    f'{", ".join(map(str, taken))}'))
+            elapsed = time.monotonic() - started
+            self.stderr.write(
+                f'{total} строк, {total / max(elapsed, 1e-9):.0f} строк/с')
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Загружено: {inserted} из {total}, конфликтов: {conflicts} '
+            f'за {elapsed:.1f} с ({total / max(elapsed, 1e-9):.0f} строк/с)'))
+        return conflicts
+
+    def finish(self, kind):
+        """Чинит то, что при bulk_create делают сигналы."""
+        model = COLUMNS[kind][0]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [model]):
+                cursor.execute(sql)
+        if kind != 'groups':
+            call_command('reconcile_counters', stdout=StringIO())
+        if kind in ('posts', 'comments'):
+            rebuild_index()
+        bump_generation(SITE_SCOPE)
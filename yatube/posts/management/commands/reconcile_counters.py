@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+def count_of(model, field):
+    """Подзапрос COUNT(*) строк model, ссылающихся на внешнюю строку."""
+    rows = (model.objects.filter(**{field: OuterRef('pk')})
+            .order_by().values(field).annotate(total=Count('pk'))
+            .values('total'))
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики постов, подписчиков и комментариев с данными.'
+
+    def handle(self, *args, **options):
+        fixed_authors = 0
+        users = User.objects.annotate(
+            real_posts=count_of(Post, 'author'),
+            real_followers=count_of(Follow, 'author'),
+            posts_count=F('stats__posts_count'),
+            followers_count=F('stats__followers_count'),
+        ).values_list('pk', 'real_posts', 'real_followers',
+                      'posts_count', 'followers_count')
+        for pk, real_posts, real_followers, posts, followers in (
+                users.iterator()):
+            if (real_posts, real_followers) == (posts, followers):
+                continue
+            AuthorStats.objects.update_or_create(
+                user_id=pk,
+                defaults={'posts_count': real_posts,
+                          'followers_count': real_followers},
+            )
+            fixed_authors += 1
+
+        fixed_posts = 0
+        drifted = Post.objects.annotate(
+            real_comments=count_of(Comment, 'post'),
+        ).exclude(comments_count=F('real_comments')).values_list(
+            'pk', 'real_comments')
+        for pk, real_comments in drifted.iterator():
+            Post.objects.filter(pk=pk).update(comments_count=real_comments)
+            fixed_posts += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено авторов: {fixed_authors}, постов: {fixed_posts}'))
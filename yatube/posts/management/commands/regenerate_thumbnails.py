@@ -0,0 +1,71 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import Post, Thumbnail
+from posts.thumbnails import (generate_in_thread, generate_thumbnail,
+                              threads_allowed, thumbnails_ready)
+
+BATCH_SIZE = 1000
+
+
+def post_images():
+    """Пары (id, картинка) пачками по первичному ключу.
+
+    Курсор не держится открытым между пачками, иначе SQLite не даст
+    потокам записать результат.
+    """
+    last_pk = 0
+    while True:
+        batch = list(
+            Post.objects.filter(pk__gt=last_pk).exclude(image='')
+            .order_by('pk').values_list('pk', 'image')[:BATCH_SIZE])
+        if not batch:
+            return
+        yield from batch
+        last_pk = batch[-1][0]
+
+
+class Command(BaseCommand):
+    help = 'Параллельно создаёт наборы миниатюр картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число потоков, создающих миниатюры; 0 — без потоков.')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать и уже готовые миниатюры.')
+
+    def handle(self, *args, workers, force, **options):
+        if not threads_allowed():
+            workers = 0
+        started = time.monotonic()
+        results = {True: 0, False: 0}
+        skipped = 0
+        pending = set()
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            for _, image in post_images():
+                if force:
+                    default.kvstore.delete_thumbnails(ImageFile(image))
+                    Thumbnail.objects.filter(image=image).delete()
+                elif thumbnails_ready(image):
+                    skipped += 1
+                    continue
+                if not workers:
+                    results[generate_thumbnail(image)] += 1
+                    continue
+                if len(pending) >= workers * 4:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[future.result()] += 1
+                pending.add(executor.submit(generate_in_thread, image))
+            for future in wait(pending).done:
+                results[future.result()] += 1
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {results[True]}, пропущено: {skipped}, '
+            f'ошибок: {results[False]} за {elapsed:.1f} с'))
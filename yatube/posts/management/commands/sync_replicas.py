@@ -0,0 +1,29 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.routers import PRIMARY
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик из '
+            'YATUBE_REPLICAS — локальная замена репликации.')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: задайте YATUBE_REPLICAS')
+        primary = connections[PRIMARY]
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            started = time.monotonic()
+            connections[alias].close()
+            target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(
+                f'{alias}: скопировано за {time.monotonic() - started:.2f} с'))
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+CREATE_INDEXES = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5("
+    "text, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_comment_fts USING fts5("
+    "text, post_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')",
+    'INSERT INTO posts_post_fts (rowid, text) '
+    'SELECT id, text FROM posts_post',
+    'INSERT INTO posts_comment_fts (rowid, text, post_id) '
+    'SELECT id, text, post_id FROM posts_comment',
+)
+DROP_INDEXES = (
+    'DROP TABLE IF EXISTS posts_post_fts',
+    'DROP TABLE IF EXISTS posts_comment_fts',
+)
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_INDEXES), run(DROP_INDEXES)),
+    ]
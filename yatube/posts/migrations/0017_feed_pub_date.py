@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:05
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_pub_dates(apps, schema_editor):
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    Post = apps.get_model('posts', 'Post')
+    FeedEntry.objects.update(pub_date=Subquery(
+        Post.objects.filter(pk=OuterRef('post')).values('pub_date')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_feed_unread'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedentry',
+            name='pub_date',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата публикации поста'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_pub_dates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'pub_date'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='authorstats',
+            name='feed_pulled',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Посты «тяжёлых» авторов забраны'),
+        ),
+        migrations.AddField(
+            model_name='authorstats',
+            name='heavy_since',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Посты не раскладываются с'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_feed_pub_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Thumbnail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.CharField(max_length=255, verbose_name='Картинка')),
+                ('geometry', models.CharField(max_length=20, verbose_name='Геометрия')),
+                ('name', models.CharField(max_length=255, verbose_name='Файл миниатюры')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(verbose_name='Высота')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='thumbnail',
+            constraint=models.UniqueConstraint(fields=('image', 'geometry'), name='unique_thumbnail'),
+        ),
+    ]
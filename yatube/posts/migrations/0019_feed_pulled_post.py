@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='feed_pulled_post',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Последний забранный пост «тяжёлых» авторов'),
+        ),
+    ]
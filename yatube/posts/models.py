@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import OuterRef, Prefetch, Subquery
 
 User = get_user_model()
 
@@ -14,9 +15,30 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты для ленты: автор, группа и превью комментариев.
+
+        Страница из любого числа постов выбирается за два запроса: посты
+        с авторами и группами и последние комментарии всех постов сразу.
+        """
+        latest = Comment.objects.filter(post=OuterRef('post')).order_by(
+            '-created', '-pk').values('pk')[:settings.COMMENT_PREVIEW_COUNT]
+        return self.select_related('author', 'group').prefetch_related(
+            Prefetch('comments',
+                     queryset=Comment.objects.filter(
+                         pk__in=Subquery(latest)).select_related('author'),
+                     to_attr='comment_previews'))
+
+    def for_detail(self):
+        """Пост для отдельной страницы: автор со счётчиками и группа."""
+        return self.select_related('author__stats', 'group')
+
+
 class Post(models.Model):
     text = models.TextField("Текст поста")
     pub_date = models.DateTimeField("Дата публикации", auto_now_add=True)
+    updated = models.DateTimeField("Дата изменения", auto_now=True)
     group = models.ForeignKey(
         Group,
         null=True, blank=True,
@@ -33,9 +55,23 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:settings.LIMITATION_TEXT]
@@ -57,6 +93,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -77,3 +117,96 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique_follower')
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Запись ленты подписок, разложенная подписчику при публикации."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date'],
+                         name='feed_user_pub_date_idx'),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Поддерживаемые счётчики пользователя вместо COUNT(*) на странице.
+
+    Кроме счётчиков автора хранит число новых постов в его ленте
+    подписок с последнего просмотра ленты (feed_seen), дату и id
+    последнего забранного в ленту поста «тяжёлых» авторов (feed_pulled,
+    feed_pulled_post) и момент, с которого сам автор «тяжёлый»
+    (heavy_since).
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+    unread_count = models.PositiveIntegerField(
+        'Новых постов в ленте',
+        default=0
+    )
+    feed_seen = models.DateTimeField(
+        'Лента просмотрена',
+        null=True,
+        blank=True
+    )
+    feed_pulled = models.DateTimeField(
+        'Посты «тяжёлых» авторов забраны',
+        null=True,
+        blank=True
+    )
+    feed_pulled_post = models.PositiveIntegerField(
+        'Последний забранный пост «тяжёлых» авторов',
+        null=True,
+        blank=True
+    )
+    heavy_since = models.DateTimeField(
+        'Посты не раскладываются с',
+        null=True,
+        blank=True
+    )
+
+
+class Thumbnail(models.Model):
+    """Созданная миниатюра картинки поста.
+
+    Записывается по окончании генерации: по ней страница находит готовый
+    файл, не вычисляя его имя за sorl и не обращаясь к хранилищу sorl.
+    """
+    image = models.CharField('Картинка', max_length=255)
+    geometry = models.CharField('Геометрия', max_length=20)
+    name = models.CharField('Файл миниатюры', max_length=255)
+    width = models.PositiveIntegerField('Ширина')
+    height = models.PositiveIntegerField('Высота')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image', 'geometry'],
+                                    name='unique_thumbnail')
+        ]
@@ -0,0 +1,122 @@
+import re
+
+from django.conf import settings
+from django.core.paginator import Page
+from django.db import connection
+
+from .models import Post
+from .utils import PAGE_WINDOW
+
+POST_INDEX = 'posts_post_fts'
+COMMENT_INDEX = 'posts_comment_fts'
+WORD = re.compile(r'\w+')
+
+FILL_INDEXES = (
+    f'DELETE FROM {POST_INDEX}',
+    f'INSERT INTO {POST_INDEX} (rowid, text) SELECT id, text FROM posts_post',
+    f'DELETE FROM {COMMENT_INDEX}',
+    f'INSERT INTO {COMMENT_INDEX} (rowid, text, post_id) '
+    'SELECT id, text, post_id FROM posts_comment',
+)
+
+
+def fts_available():
+    """Полнотекстовый индекс есть только в SQLite с FTS5."""
+    return connection.vendor == 'sqlite'
+
+
+def _execute(*statements, params=()):
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql, params)
+
+
+def rebuild_index():
+    """Заполняет индексы заново по постам и комментариям."""
+    if fts_available():
+        _execute(*FILL_INDEXES)
+
+
+def index_post(post):
+    if fts_available():
+        _execute(f'INSERT OR REPLACE INTO {POST_INDEX} (rowid, text) '
+                 'VALUES (%s, %s)', params=[post.pk, post.text])
+
+
+def unindex_post(post_id):
+    if fts_available():
+        _execute(f'DELETE FROM {POST_INDEX} WHERE rowid = %s',
+                 params=[post_id])
+
+
+def index_comment(comment):
+    if fts_available():
+        _execute(f'INSERT OR REPLACE INTO {COMMENT_INDEX} '
+                 '(rowid, text, post_id) '
+                 'VALUES (%s, %s, %s)',
+                 params=[comment.pk, comment.text, comment.post_id])
+
+
+def unindex_comment(comment_id):
+    if fts_available():
+        _execute(f'DELETE FROM {COMMENT_INDEX} WHERE rowid = %s',
+                 params=[comment_id])
+
+
+def match_expression(query):
+    """Запрос пользователя как выражение FTS5: все слова, по префиксу.
+
+    Слова берутся в кавычки, поэтому операторы FTS5 в запросе не работают,
+    а префиксный поиск отчасти заменяет отсутствующий русский стеммер.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD.findall(query))
+
+
+def search_post_ids(query, offset, limit, with_comments=False):
+    """id постов по убыванию релевантности (bm25)."""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    if not fts_available():
+        return list(Post.objects.filter(text__icontains=query).values_list(
+            'pk', flat=True)[offset:offset + limit])
+    sql = (f'SELECT rowid AS post_id, bm25({POST_INDEX}) AS rank '
+           f'FROM {POST_INDEX} WHERE {POST_INDEX} MATCH %s')
+    params = [expression]
+    if with_comments:
+        sql = (f'SELECT post_id, MIN(rank) AS rank FROM ({sql} UNION ALL '
+               f'SELECT post_id, bm25({COMMENT_INDEX}) FROM {COMMENT_INDEX} '
+               f'WHERE {COMMENT_INDEX} MATCH %s) GROUP BY post_id')
+        params.append(expression)
+    sql += ' ORDER BY rank LIMIT %s OFFSET %s'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_posts(query, offset, limit, with_comments=False):
+    """Найденные посты по релевантности, выбранные как для ленты."""
+    ids = search_post_ids(query, offset, limit, with_comments)
+    posts = Post.objects.for_feed().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+def search_page(query, number, with_comments=False):
+    """Страница результатов без COUNT(*): выбирается на строку больше."""
+    try:
+        number = max(int(number), 1)
+    except (TypeError, ValueError):
+        number = 1
+    per_page = settings.POSTS_COUNT
+    rows = search_posts(query, (number - 1) * per_page, per_page + 1,
+                        with_comments)
+    has_next = len(rows) > per_page
+    page = Page(rows[:per_page], number, None)
+    page.has_next = lambda: has_next
+    page.has_previous = lambda: number > 1
+    page.next_page_number = lambda: number + 1
+    page.previous_page_number = lambda: number - 1
+    page.page_window = range(max(number - PAGE_WINDOW, 1),
+                             number + (2 if has_next else 1))
+    page.last_page_number = None
+    return page
@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import SITE_SCOPE, bump_generation, post_scopes
+from .counters import change_author_counter, change_comments_counter
+from .feed import (backfill_feed, fan_out_post, forget_unread, mark_unread,
+                   refresh_follow_feeds, remove_author_from_feed,
+                   update_heavy_since)
+from .groups import GROUPS_SCOPE, forget_groups
+from .models import AuthorStats, Comment, Follow, Group, Post
+from .search import (index_comment, index_post, unindex_comment,
+                     unindex_post)
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    if instance.pk:
+        old_slug = Post.objects.filter(pk=instance.pk).values_list(
+            'group__slug', flat=True).first()
+        if old_slug:
+            bump_generation(f'group:{old_slug}')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    bump_generation(*post_scopes(instance))
+    index_post(instance)
+    if created:
+        change_author_counter(instance.author_id, 'posts_count', 1)
+        fan_out_post(instance)
+        mark_unread(instance)
+    else:
+        refresh_follow_feeds(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_author_counter(instance.author_id, 'posts_count', -1)
+    forget_unread(instance)
+    refresh_follow_feeds(instance)
+    unindex_post(instance.pk)
+    bump_generation(*post_scopes(instance))
+
+
+def comment_changed(comment):
+    """Сбрасывает ленты с превью комментариев и счётчиком поста."""
+    if Comment._meta.get_field('post').is_cached(comment):
+        post = comment.post
+    else:
+        post = Post.objects.select_related('author', 'group').filter(
+            pk=comment.post_id).first()
+    if post is not None:
+        bump_generation(*post_scopes(post))
+        refresh_follow_feeds(post)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    index_comment(instance)
+    if created:
+        change_comments_counter(instance.post_id, 1)
+    comment_changed(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_comments_counter(instance.post_id, -1)
+    unindex_comment(instance.pk)
+    comment_changed(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    forget_groups()
+    bump_generation(SITE_SCOPE, GROUPS_SCOPE)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+        return
+    if update_fields == frozenset({'last_login'}):
+        return
+    bump_generation(SITE_SCOPE)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, **kwargs):
+    bump_generation(SITE_SCOPE)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        change_author_counter(instance.author_id, 'followers_count', 1)
+        update_heavy_since(instance.author_id)
+        backfill_feed(instance.user, instance.author)
+        bump_generation(f'profile:{instance.author.username}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_author_counter(instance.author_id, 'followers_count', -1)
+    remove_author_from_feed(instance.user_id, instance.author_id)
+    update_heavy_since(instance.author_id)
+    bump_generation(f'profile:{instance.author.username}')
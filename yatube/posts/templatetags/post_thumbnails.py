@@ -0,0 +1,11 @@
+from django import template
+
+from posts.thumbnails import thumbnail_set
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnails(post, profile='feed'):
+    """Набор миниатюр поста для srcset или None, пока их создаёт воркер."""
+    return thumbnail_set(post.image, profile)
@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (Client, RequestFactory, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.conditional import follow_validators
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Текст')
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(settings.POSTS_COUNT + 3))
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ApiTest.user)
+
+    def revalidate(self, client, url):
+        """Ответ на повторный запрос с валидаторами первого ответа."""
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_feeds_are_json_pages(self):
+        """Ленты отдаются страницами JSON со ссылкой на следующую."""
+        urls = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group_list', args=[ApiTest.group.slug]),
+            reverse('posts:api_profile', args=[ApiTest.author.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.guest_client.get(url).json()
+                self.assertEqual(len(data['results']), settings.POSTS_COUNT)
+                self.assertEqual(data['results'][0]['id'], ApiTest.post.pk)
+                self.assertIsNone(data['previous'])
+                rest = self.guest_client.get(data['next']).json()
+                self.assertEqual(len(rest['results']), 4)
+
+    def test_post_detail(self):
+        """Пост отдаётся вместе с первой порцией комментариев."""
+        Comment.objects.create(post=ApiTest.post, author=ApiTest.user,
+                               text='Комментарий')
+        data = self.guest_client.get(reverse(
+            'posts:api_post_detail', args=[ApiTest.post.pk])).json()
+        self.assertEqual(data['text'], ApiTest.post.text)
+        self.assertEqual(data['group'], ApiTest.group.slug)
+        self.assertEqual([c['text'] for c in data['comments']],
+                         ['Комментарий'])
+
+    def test_not_modified_without_queries(self):
+        """Неизменившаяся лента отвечает 304 без запросов к базе."""
+        for url in (reverse('posts:api_index'), reverse('posts:index')):
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_changes_invalidate_validators(self):
+        """Изменение данных страницы меняет её ETag."""
+        post_url = reverse('posts:api_post_detail', args=[ApiTest.post.pk])
+        cases = (
+            (reverse('posts:api_index'),
+             lambda: Post.objects.create(author=ApiTest.author, text='Ещё')),
+            (reverse('posts:index'), lambda: Post.objects.exclude(
+                pk=ApiTest.post.pk).first().delete()),
+            (post_url, lambda: Comment.objects.create(
+                post=ApiTest.post, author=ApiTest.user, text='Ответ')),
+            (reverse('posts:post_detail', args=[ApiTest.post.pk]),
+             lambda: Follow.objects.create(
+                 user=ApiTest.user, author=ApiTest.author)),
+        )
+        for url, change in cases:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                change()
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_follow_feed_validators(self):
+        """Лента подписок меняет ETag после подписки и отвечает 304."""
+        url = reverse('posts:api_follow_index')
+        self.assertEqual(
+            self.revalidate(self.authorized_client, url).status_code, 304)
+        etag = self.authorized_client.get(url)['ETag']
+        Follow.objects.create(user=ApiTest.user, author=ApiTest.author)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']),
+                         settings.POSTS_COUNT)
+
+    def test_follow_feed_validators_follow_changes(self):
+        """ETag ленты подписок меняется после правки поста и нового поста
+        «тяжёлого» автора; валидаторы не читают ленту."""
+        url = reverse('posts:api_follow_index')
+        Follow.objects.create(user=ApiTest.user, author=ApiTest.author)
+        changes = {
+            settings.FEED_FANOUT_LIMIT: lambda: Post.objects.get(
+                pk=ApiTest.post.pk).save(),
+            0: lambda: Post.objects.create(author=ApiTest.author,
+                                           text='Новый'),
+        }
+        for limit, change in changes.items():
+            with self.subTest(limit=limit), \
+                    override_settings(FEED_FANOUT_LIMIT=limit):
+                etag = self.authorized_client.get(url)['ETag']
+                change()
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+        request = RequestFactory().get(url)
+        request.user = ApiTest.user
+        with self.assertNumQueries(1):
+            follow_validators(request)
+
+    def test_validators_depend_on_user(self):
+        """ETag гостя не подходит пользователю: шапка у них разная."""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
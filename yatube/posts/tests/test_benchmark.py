@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts.benchmark import percentile, regressions
+from posts.models import Post
+
+VIEWS = ('index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+         'post_create', 'add_comment')
+
+
+class BenchmarkViewsTest(TestCase):
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output, ignore_errors=True)
+
+    def run_benchmark(self, *args):
+        call_command('benchmark_views', '--users=5', '--groups=2',
+                     '--posts=30', '--comments=20', '--follows=10',
+                     '--requests=3', f'--output={self.output}',
+                     '--in-place', *args,
+                     stdout=StringIO())
+        runs = sorted(os.listdir(self.output))
+        with open(os.path.join(self.output, runs[-1])) as file:
+            return json.load(file)
+
+    def test_reports_every_view_and_rolls_back(self):
+        """Прогон сохраняет метрики всех представлений и откатывает данные."""
+        results = self.run_benchmark()
+        self.assertEqual(set(results['views']), set(VIEWS))
+        for stats in results['views'].values():
+            self.assertEqual(stats['requests'], 3)
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+            self.assertGreater(stats['queries'], 0)
+        self.assertFalse(Post.objects.exists())
+
+    def test_keeps_shared_cache(self):
+        """Прогон работает со своим кешем и не чистит общий."""
+        cache.set('benchmark-test', 'общий')
+        self.run_benchmark()
+        self.assertEqual(cache.get('benchmark-test'), 'общий')
+
+    def test_fails_on_regression(self):
+        """Рост числа запросов относительно прошлого прогона — ошибка."""
+        results = self.run_benchmark()
+        for stats in results['views'].values():
+            stats['queries'] = 0
+        with open(os.path.join(self.output, '0.json'), 'w') as file:
+            json.dump(results, file)
+        with self.assertRaises(CommandError):
+            self.run_benchmark(f'--compare={self.output}/0.json',
+                               '--fail-on-regression')
+
+    def test_percentile_and_regressions(self):
+        """Перцентиль по рангу и порог замедления p95."""
+        self.assertEqual(percentile([3, 1, 2, 4], 0.5), 2)
+        self.assertEqual(percentile([3, 1, 2, 4], 0.99), 4)
+        old = {'views': {'index': {'p95_ms': 10, 'queries': 2}}}
+        new = {'views': {'index': {'p95_ms': 11, 'queries': 2}}}
+        self.assertEqual(regressions(new, old, 0.2), [])
+        new['views']['index']['p95_ms'] = 13
+        self.assertEqual(len(regressions(new, old, 0.2)), 1)
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+COMMENTS_TOTAL: int = 45
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(
+            author=CommentPaginationTest.author, text='Тестовый пост')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.author, text=f'Ответ {i}')
+            for i in range(COMMENTS_TOTAL))
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_post_detail_renders_first_portion(self):
+        """На странице поста только первая порция комментариев."""
+        response = self.guest_client.get(reverse(
+            'posts:post_detail', args=[CommentPaginationTest.post.pk]))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.COMMENTS_COUNT)
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'id="more-comments"')
+
+    def test_load_more_walks_all_comments(self):
+        """«Показать ещё» по JSON отдаёт все комментарии без повторов."""
+        url = reverse('posts:post_comments',
+                      args=[CommentPaginationTest.post.pk])
+        seen, portions = [], []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                data = self.guest_client.get(url).json()
+            portions.append(len(queries))
+            seen.extend(comment['id'] for comment in data['comments'])
+            url = data['next']
+        expected = list(CommentPaginationTest.post.comments.order_by(
+            '-created', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(set(portions)), 1)
+
+    def test_unknown_post_is_404(self):
+        """Комментарии несуществующего поста — 404."""
+        response = self.guest_client.get(
+            reverse('posts:post_comments', args=[0]))
+        self.assertEqual(response.status_code, 404)
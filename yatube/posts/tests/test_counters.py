@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(
+            author=CountersTest.author,
+            text='Тестовый пост',
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(CountersTest.user)
+
+    def stats(self):
+        return AuthorStats.objects.get(user=CountersTest.author)
+
+    def test_posts_count_follows_create_and_delete(self):
+        """Счётчик постов автора меняется при создании и удалении."""
+        self.assertEqual(self.stats().posts_count, 1)
+        post = Post.objects.create(author=CountersTest.author, text='Ещё')
+        self.assertEqual(self.stats().posts_count, 2)
+        post.delete()
+        self.assertEqual(self.stats().posts_count, 1)
+
+    def test_followers_count_follows_subscriptions(self):
+        """Счётчик подписчиков меняется при подписке и отписке."""
+        self.authorized_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': CountersTest.author}))
+        self.assertEqual(self.stats().followers_count, 1)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': CountersTest.author}))
+        self.assertEqual(self.stats().followers_count, 0)
+
+    def test_comments_count_follows_comments(self):
+        """Счётчик комментариев поста меняется при комментировании."""
+        self.authorized_client.post(
+            reverse('posts:add_comment',
+                    kwargs={'post_id': CountersTest.post.id}),
+            data={'text': 'Комментарий'})
+        CountersTest.post.refresh_from_db()
+        self.assertEqual(CountersTest.post.comments_count, 1)
+        Comment.objects.all().delete()
+        CountersTest.post.refresh_from_db()
+        self.assertEqual(CountersTest.post.comments_count, 0)
+
+    def test_missing_stats_are_rebuilt(self):
+        """Отсутствующие счётчики пересчитываются по данным."""
+        AuthorStats.objects.filter(user=CountersTest.author).delete()
+        Follow.objects.create(user=CountersTest.user,
+                              author=CountersTest.author)
+        stats = self.stats()
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+
+    def test_reconcile_counters_fixes_drift(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        AuthorStats.objects.filter(user=CountersTest.author).update(
+            posts_count=10, followers_count=5)
+        Post.objects.filter(pk=CountersTest.post.pk).update(
+            comments_count=3)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        stats = self.stats()
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 0)
+        CountersTest.post.refresh_from_db()
+        self.assertEqual(CountersTest.post.comments_count, 0)
+        self.assertIn('авторов: 1, постов: 1', out.getvalue())
@@ -1,8 +1,13 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import (Client, RequestFactory, TestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Group, Post, Follow
+from posts.feed import FEED_PAGE_KEY, follow_feed
+from posts.models import FeedEntry, Group, Post, Follow
+from posts.utils import get_page
 
 User = get_user_model()
 TEST_OF_POST: int = 13
@@ -81,3 +86,86 @@ class PostModelTest(TestCase):
         response = self.client.get(
             reverse('posts:follow_index'))
         self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_follow_backfills_and_unfollow_clears_feed(self):
+        """Подписка добавляет посты автора в ленту, отписка убирает."""
+        self.authorized_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': PostModelTest.author}))
+        self.assertTrue(FeedEntry.objects.filter(
+            user=PostModelTest.user, post=PostModelTest.post).exists())
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': PostModelTest.author}))
+        self.assertFalse(FeedEntry.objects.filter(
+            user=PostModelTest.user).exists())
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост раскладывается в ленты подписчиков."""
+        Follow.objects.create(user=PostModelTest.user,
+                              author=PostModelTest.author)
+        post = Post.objects.create(author=PostModelTest.author,
+                                   text='Новый пост')
+        self.assertTrue(FeedEntry.objects.filter(
+            user=PostModelTest.user, post=post).exists())
+        self.assertFalse(FeedEntry.objects.filter(
+            user=PostModelTest.user2, post=post).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_heavy_author_is_read_on_request(self):
+        """Посты «тяжёлого» автора не раскладываются, но видны в ленте."""
+        Follow.objects.create(user=PostModelTest.user,
+                              author=PostModelTest.author)
+        post = Post.objects.create(author=PostModelTest.author,
+                                   text='Новый пост')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        response = self.authorized_client.get(
+            reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+        self.assertEqual(len(response.context['page_obj']), 2)
+        newer = Post.objects.create(author=PostModelTest.author,
+                                    text='Следующий пост')
+        follow_feed(PostModelTest.user)
+        self.assertEqual(
+            list(FeedEntry.objects.filter(user=PostModelTest.user)
+                 .order_by('-pub_date', '-pk').values_list('post', flat=True)),
+            [newer.pk, post.pk, PostModelTest.post.pk])
+
+    def test_feed_page_read_by_index(self):
+        """Страницы ленты, которые строит get_page, читаются по индексу,
+        без сортировки всей ленты."""
+        Follow.objects.create(user=PostModelTest.user,
+                              author=PostModelTest.author)
+        for i in range(TEST_OF_POST):
+            Post.objects.create(author=PostModelTest.author, text=f'Пост {i}')
+        posts = follow_feed(PostModelTest.user).for_feed()
+        first = get_page(posts, RequestFactory().get('/follow/'),
+                         **FEED_PAGE_KEY)['page_obj']
+        self.assertTrue(first.next_cursor)
+        for cursor in ('', first.next_cursor):
+            request = RequestFactory().get('/follow/', {'cursor': cursor})
+            with CaptureQueriesContext(connection) as queries:
+                get_page(posts, request, **FEED_PAGE_KEY)
+            selects = [query['sql'] for query in queries.captured_queries
+                       if 'posts_feedentry' in query['sql']]
+            self.assertEqual(len(selects), 1)
+            with connection.cursor() as db_cursor:
+                db_cursor.execute(f'EXPLAIN QUERY PLAN {selects[0]}')
+                plan = ' '.join(str(row) for row in db_cursor.fetchall())
+            self.assertIn('feed_user_pub_date_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_posts_backfilled_when_author_stops_being_heavy(self):
+        """Посты, опубликованные, пока автор был «тяжёлым», раскладываются
+        подписчикам, когда подписчиков становится меньше."""
+        Follow.objects.create(user=PostModelTest.user,
+                              author=PostModelTest.author)
+        Follow.objects.create(user=PostModelTest.user2,
+                              author=PostModelTest.author)
+        post = Post.objects.create(author=PostModelTest.author,
+                                   text='Пост «тяжёлого» автора')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        Follow.objects.filter(user=PostModelTest.user2).delete()
+        self.assertTrue(FeedEntry.objects.filter(
+            user=PostModelTest.user, post=post).exists())
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 from http import HTTPStatus
@@ -91,7 +92,8 @@ class PostFormTests(TestCase):
                 group=PostFormTests.group.id,
                 text=form_data['text'],
                 author=PostFormTests.user,
-                image='posts/small.gif',
+                image=(f'posts/{hashlib.sha256(small_gif).hexdigest()}'
+                       '.jpg'),
             ).exists()
         )
 
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.groups import get_group
+from posts.models import Group, Post, User
+
+
+class GroupCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Текст')
+        cls.empty = Group.objects.create(
+            title='Пустая группа', slug='empty', description='Текст')
+        Post.objects.create(author=cls.author, group=cls.group, text='Первый')
+        cls.latest = Post.objects.create(
+            author=cls.author, group=cls.group, text='Последний')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_group_cached_in_process(self):
+        """Повторное чтение группы не обращается к базе."""
+        get_group('test-slug')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_group('test-slug'), GroupCacheTest.group)
+
+    def test_cache_invalidated_on_change(self):
+        """Изменение группы сбрасывает кеш."""
+        get_group('test-slug')
+        group = Group.objects.get(pk=GroupCacheTest.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        self.assertEqual(get_group('test-slug').title, 'Новое название')
+        group.delete()
+        self.assertIsNone(get_group('test-slug'))
+
+    def test_unknown_group_is_404(self):
+        """Несуществующая группа — 404."""
+        response = self.guest_client.get(
+            reverse('posts:group_list', args=['missing']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_directory(self):
+        """Каталог групп: число постов и последний пост каждой."""
+        response = self.guest_client.get(reverse('posts:groups'))
+        groups = {group.slug: group for group in response.context['groups']}
+        self.assertEqual(groups['test-slug'].posts_total, 2)
+        self.assertEqual(groups['test-slug'].latest_post,
+                         GroupCacheTest.latest)
+        self.assertEqual(groups['empty'].posts_total, 0)
+        self.assertIsNone(groups['empty'].latest_post)
+        self.assertContains(response, 'Последний')
+
+    def test_directory_refreshed_periodically(self):
+        """Каталог берётся из кеша, а не считается на каждый запрос."""
+        self.guest_client.get(reverse('posts:groups'))
+        Post.objects.create(author=GroupCacheTest.author,
+                            group=GroupCacheTest.group, text='Новый')
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(reverse('posts:groups'))
+        groups = {group.slug: group for group in response.context['groups']}
+        self.assertEqual(groups['test-slug'].posts_total, 2)
@@ -0,0 +1,70 @@
+import os
+import pstats
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+
+class ProfilingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def get(self, **overrides):
+        options = {
+            'PROFILING_ENABLED': True,
+            'PROFILING_SAMPLE_RATE': 1,
+            'PROFILING_DIR': self.directory,
+        }
+        options.update(overrides)
+        with override_settings(**options):
+            return Client().get(reverse('posts:index'))
+
+    def test_disabled_by_default(self):
+        """Без PROFILING_ENABLED заголовка Server-Timing нет."""
+        response = Client().get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_phases_in_server_timing(self):
+        """Выбранный запрос получает время фаз в Server-Timing."""
+        timing = self.get()['Server-Timing']
+        for name in ('view', 'db', 'template'):
+            self.assertIn(f'{name};dur=', timing)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_not_sampled(self):
+        """Запрос вне выборки не профилируется."""
+        response = self.get(PROFILING_SAMPLE_RATE=0)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_pstats_dump(self):
+        """Путь из PROFILING_DUMP_PATTERNS сохраняет профиль cProfile."""
+        self.get(PROFILING_DUMP_PATTERNS=[r'^/$'])
+        name, = os.listdir(self.directory)
+        self.assertTrue(name.startswith('posts-index-'))
+        stats = pstats.Stats(os.path.join(self.directory, name))
+        self.assertGreater(stats.total_calls, 0)
+
+    def test_collapsed_dump(self):
+        """В формате collapsed сохраняются свёрнутые стеки."""
+        self.get(PROFILING_DUMP_PATTERNS=[r'^/$'],
+                 PROFILING_FORMAT='collapsed', PROFILING_INTERVAL=0.0001)
+        name, = os.listdir(self.directory)
+        self.assertTrue(name.endswith('.collapsed'))
+        with open(os.path.join(self.directory, name)) as file:
+            line = file.readline()
+        stack, count = line.rsplit(' ', 1)
+        self.assertIn(';', stack)
+        self.assertGreater(int(count), 0)
@@ -0,0 +1,150 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.middleware import QueryBudgetExceeded
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+POSTS_PER_AUTHOR: int = 6
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTest(TestCase):
+    """Каждый view укладывается в бюджет запросов без N+1."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for name in ('author', 'another'):
+            cls.author = User.objects.create(username=name)
+            Follow.objects.create(user=cls.user, author=cls.author)
+            for i in range(POSTS_PER_AUTHOR):
+                cls.post = Post.objects.create(
+                    author=cls.author, group=cls.group, text=f'Пост {i}')
+                Comment.objects.create(
+                    post=cls.post, author=cls.user, text=f'Ответ {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(QueryBudgetTest.user)
+        self.author_client = Client()
+        self.author_client.force_login(QueryBudgetTest.author)
+
+    def assertWithinBudget(self, view_name, response):
+        self.assertLessEqual(int(response['X-Query-Count']),
+                             settings.QUERY_BUDGETS[view_name])
+
+    def test_pages_fit_query_budgets(self):
+        """Страницы укладываются в бюджет запросов из QUERY_BUDGETS."""
+        post = QueryBudgetTest.post
+        pages = {
+            'posts:index': (self.client, reverse('posts:index')),
+            'posts:group_list': (self.client, reverse(
+                'posts:group_list',
+                kwargs={'slug': QueryBudgetTest.group.slug})),
+            'posts:profile': (self.client, reverse(
+                'posts:profile', kwargs={'username': post.author.username})),
+            'posts:post_detail': (self.client, reverse(
+                'posts:post_detail', kwargs={'post_id': post.id})),
+            'posts:follow_index': (self.client, reverse(
+                'posts:follow_index')),
+            'posts:post_comments': (self.client, reverse(
+                'posts:post_comments', kwargs={'post_id': post.id})),
+            'posts:api_index': (self.client, reverse('posts:api_index')),
+            'posts:api_post_detail': (self.client, reverse(
+                'posts:api_post_detail', kwargs={'post_id': post.id})),
+            'posts:api_follow_index': (self.client, reverse(
+                'posts:api_follow_index')),
+            'posts:groups': (self.client, reverse('posts:groups')),
+            'posts:follow_unread': (self.client, reverse(
+                'posts:follow_unread')),
+            'posts:search': (self.client, reverse(
+                'posts:search') + '?q=Пост&comments=on'),
+            'posts:post_create': (self.client, reverse('posts:post_create')),
+            'posts:post_edit': (self.author_client, reverse(
+                'posts:post_edit', kwargs={'post_id': post.id})),
+        }
+        for view_name, (client, url) in pages.items():
+            with self.subTest(view_name=view_name):
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertWithinBudget(view_name, response)
+
+    def test_actions_fit_query_budgets(self):
+        """Изменяющие запросы укладываются в бюджет запросов."""
+        post = QueryBudgetTest.post
+        actions = {
+            'posts:add_comment': (
+                self.client,
+                reverse('posts:add_comment', kwargs={'post_id': post.id}),
+                {'text': 'Комментарий'}),
+            'posts:post_create': (
+                self.client, reverse('posts:post_create'),
+                {'text': 'Новый пост'}),
+            'posts:post_edit': (
+                self.author_client,
+                reverse('posts:post_edit', kwargs={'post_id': post.id}),
+                {'text': 'Исправленный пост'}),
+            'posts:profile_unfollow': (
+                self.client,
+                reverse('posts:profile_unfollow',
+                        kwargs={'username': post.author.username}), {}),
+            'posts:profile_follow': (
+                self.client,
+                reverse('posts:profile_follow',
+                        kwargs={'username': post.author.username}), {}),
+        }
+        for view_name, (client, url, data) in actions.items():
+            with self.subTest(view_name=view_name):
+                response = client.post(url, data=data)
+                self.assertEqual(response.status_code, 302)
+                self.assertWithinBudget(view_name, response)
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_heavy_feed_reads_fit_query_budgets(self):
+        """Лента с «тяжёлыми» авторами без их новых постов читается в
+        бюджет запросов и не пишет в ленту."""
+        pages = {
+            'posts:follow_index': reverse('posts:follow_index'),
+            'posts:api_follow_index': reverse('posts:api_follow_index'),
+        }
+        for view_name, url in pages.items():
+            with self.subTest(view_name=view_name):
+                cache.clear()
+                with override_settings(QUERY_BUDGET_STRICT=False):
+                    self.client.get(url)
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertWithinBudget(view_name, response)
+                feed_writes = [
+                    query['sql'] for query in queries.captured_queries
+                    if not query['sql'].startswith('SELECT')
+                    and ('posts_feedentry' in query['sql']
+                         or 'feed_pulled' in query['sql'])]
+                self.assertEqual(feed_writes, [])
+
+    def test_budget_exceeded_raises(self):
+        """В строгом режиме превышение бюджета — ошибка."""
+        with override_settings(QUERY_BUDGETS={'posts:index': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('posts:index'))
+
+    def test_repeated_queries_raise(self):
+        """В строгом режиме повторы одного запроса (N+1) — ошибка."""
+        with override_settings(QUERY_DUPLICATE_LIMIT=0):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('posts:index'))
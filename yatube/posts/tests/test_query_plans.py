@@ -0,0 +1,91 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import CURSOR_NEXT, encode_cursor
+
+User = get_user_model()
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)$')
+
+
+class QueryRecorder:
+    """Запоминает SELECT-запросы вместе с параметрами."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(3):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ок')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(QueryPlanTest.user)
+
+    def full_scans(self, url):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        scans = []
+        with connection.cursor() as cursor:
+            for sql, params in recorder.queries:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                for row in cursor.fetchall():
+                    detail = row[-1]
+                    match = FULL_SCAN.match(detail)
+                    if match and match['table'].startswith('posts_'):
+                        scans.append(f'{detail}: {sql}')
+        return scans
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не читают таблицы постов целиком."""
+        post = QueryPlanTest.post
+        cursor = encode_cursor(post, CURSOR_NEXT)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + f'?cursor={cursor}',
+            reverse('posts:group_list',
+                    kwargs={'slug': QueryPlanTest.group.slug}),
+            reverse('posts:group_list',
+                    kwargs={'slug': QueryPlanTest.group.slug})
+            + f'?cursor={cursor}',
+            reverse('posts:profile',
+                    kwargs={'username': QueryPlanTest.author.username}),
+            reverse('posts:profile',
+                    kwargs={'username': QueryPlanTest.author.username})
+            + f'?cursor={cursor}',
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+            reverse('posts:follow_index'),
+            reverse('posts:follow_index') + f'?cursor={cursor}',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.full_scans(url), [])
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+POSTS: int = 12
+COMMENTS_PER_POST: int = 5
+
+
+class PostQuerySetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Текст')
+        for i in range(POSTS):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+            for j in range(COMMENTS_PER_POST):
+                Comment.objects.create(
+                    post=cls.post, author=cls.reader, text=f'Ответ {j}')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feed_fixed_queries(self):
+        """Страница ленты с авторами, группами и превью — два запроса."""
+        with self.assertNumQueries(2):
+            posts = list(Post.objects.for_feed()[:POSTS])
+            for post in posts:
+                post.author.username, post.group.slug
+                for comment in post.comment_previews:
+                    comment.author.username
+        self.assertEqual(len(posts), POSTS)
+
+    def test_feed_comment_previews(self):
+        """Превью — последние COMMENT_PREVIEW_COUNT комментариев поста."""
+        post = Post.objects.for_feed().get(pk=PostQuerySetTest.post.pk)
+        expected = list(PostQuerySetTest.post.comments.order_by(
+            '-created', '-pk')[:settings.COMMENT_PREVIEW_COUNT])
+        self.assertEqual(post.comment_previews, expected)
+
+    def test_new_comment_refreshes_feeds(self):
+        """Новый комментарий виден в закешированной ленте, ETag меняется."""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(post=PostQuerySetTest.post,
+                               author=PostQuerySetTest.reader,
+                               text='Свежий ответ')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Свежий ответ')
+
+    def test_detail_single_query(self):
+        """Пост с автором, его счётчиками и группой — один запрос."""
+        with self.assertNumQueries(1):
+            post = Post.objects.for_detail().get(pk=PostQuerySetTest.post.pk)
+            post.author.stats.posts_count, post.group.slug
+
+    def test_views_pinned_queries(self):
+        """Число запросов страниц не зависит от числа постов."""
+        pages = {
+            reverse('posts:index'): 2,
+            reverse('posts:group_list', args=['test-slug']): 3,
+            reverse('posts:profile', args=['author']): 3,
+            reverse('posts:post_detail',
+                    args=[PostQuerySetTest.post.pk]): 3,
+        }
+        for url, queries in pages.items():
+            with self.subTest(url=url):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    self.guest_client.get(url)
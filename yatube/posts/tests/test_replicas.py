@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase
+from django.urls import resolve, reverse
+
+from core.middleware import ReplicaRoutingMiddleware
+from core.routers import PRIMARY, ReplicaRouter
+from posts.models import Post
+
+User = get_user_model()
+
+
+@mock.patch('core.routers.replica_aliases', lambda: ['replica'])
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+        self.middleware = ReplicaRoutingMiddleware(
+            lambda request: HttpResponse())
+
+    def read_alias(self, request, model=Post):
+        """База, из которой view прочитал бы model."""
+        request.resolver_match = resolve(request.path)
+        return self.middleware.process_view(
+            request,
+            lambda request: self.router.db_for_read(model),
+            (), {})
+
+    def test_read_views_use_replica(self):
+        """Чтение страниц из REPLICA_VIEWS идёт на реплику."""
+        request = self.factory.get(reverse('posts:index'))
+        self.assertEqual(self.read_alias(request), 'replica')
+
+    def test_other_requests_use_primary(self):
+        """Изменения, чужие представления и сессии — в основной базе."""
+        requests = (
+            self.factory.post(reverse('posts:index')),
+            self.factory.get(reverse('posts:post_create')),
+        )
+        for request in requests:
+            with self.subTest(path=request.path, method=request.method):
+                self.assertIsNone(self.read_alias(request))
+        request = self.factory.get(reverse('posts:index'))
+        self.assertEqual(self.read_alias(request, Session), PRIMARY)
+        self.assertEqual(self.router.db_for_write(Post), PRIMARY)
+        self.assertEqual(self.router.db_for_read(Post), PRIMARY)
+
+    def test_writer_sticks_to_primary(self):
+        """После изменения пользователь какое-то время читает из основной."""
+        client = Client()
+        client.force_login(User.objects.create(username='user'))
+        response = client.post(reverse('posts:post_create'),
+                               {'text': 'Новый пост'})
+        cookie = response.cookies[settings.REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_MAX_LAG)
+        request = self.factory.get(reverse('posts:index'))
+        request.COOKIES[settings.REPLICA_STICKY_COOKIE] = '1'
+        self.assertIsNone(self.read_alias(request))
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.search import (match_expression, rebuild_index,
+                          search_post_ids)
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.rare = Post.objects.create(
+            author=SearchTest.author, text='Прогулка по осеннему лесу')
+        cls.frequent = Post.objects.create(
+            author=SearchTest.author, text='Лес, лес и снова лес')
+        cls.other = Post.objects.create(
+            author=SearchTest.author, text='Рецепт пирога')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, **params):
+        return self.guest_client.get(reverse('posts:search'), params)
+
+    def test_results_are_ranked(self):
+        """Пост с большим числом совпадений выше, лишние не находятся."""
+        response = self.search(q='лес')
+        self.assertEqual(list(response.context['page_obj']),
+                         [SearchTest.frequent, SearchTest.rare])
+
+    def test_prefix_and_case(self):
+        """Поиск не зависит от регистра и ищет по началу слова."""
+        self.assertEqual(search_post_ids('ОСЕН', 0, 10),
+                         [SearchTest.rare.pk])
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        post = Post.objects.create(author=SearchTest.author, text='Море')
+        self.assertEqual(search_post_ids('море', 0, 10), [post.pk])
+        post.text = 'Горы'
+        post.save()
+        self.assertEqual(search_post_ids('море', 0, 10), [])
+        self.assertEqual(search_post_ids('горы', 0, 10), [post.pk])
+        post.delete()
+        self.assertEqual(search_post_ids('горы', 0, 10), [])
+
+    def test_comments_are_searched_on_request(self):
+        """Комментарии учитываются только с флажком comments."""
+        Comment.objects.create(post=SearchTest.other,
+                               author=SearchTest.author, text='Яблоки')
+        self.assertEqual(list(self.search(q='яблоки').context['page_obj']),
+                         [])
+        response = self.search(q='яблоки', comments='on')
+        self.assertEqual(list(response.context['page_obj']),
+                         [SearchTest.other])
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(match_expression('лес" OR -*'), '"лес"* "OR"*')
+        self.assertEqual(self.search(q='"(').status_code, 200)
+
+    def test_pagination_keeps_query(self):
+        """Страницы результатов сохраняют строку запроса."""
+        Post.objects.bulk_create(
+            Post(author=SearchTest.author, text=f'Пирог {i}')
+            for i in range(settings.POSTS_COUNT + 1))
+        rebuild_index()
+        response = self.search(q='пирог')
+        self.assertTrue(response.context['page_obj'].has_next())
+        self.assertContains(response, '?q=%D0%BF%D0%B8%D1%80%D0%BE%D0%B3'
+                                      '&amp;page=2')
+        response = self.search(q='пирог', page=2)
+        self.assertEqual(len(response.context['page_obj']), 2)
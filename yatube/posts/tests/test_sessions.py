@@ -0,0 +1,89 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.sessions import SessionStore, forget
+from posts.models import User
+
+
+class SessionStoreTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+
+    def setUp(self):
+        cache.clear()
+
+    def session_queries(self, client):
+        with CaptureQueriesContext(connection) as captured:
+            client.get(reverse('posts:follow_unread'))
+        return [query['sql'] for query in captured
+                if 'django_session' in query['sql']]
+
+    def test_authenticated_requests_skip_session_table(self):
+        """Вошедший пользователь не читает таблицу сессий на запросах."""
+        client = Client()
+        client.force_login(SessionStoreTest.user)
+        self.assertEqual(self.session_queries(client), [])
+        cache.clear()
+        self.assertEqual(self.session_queries(client), [])
+
+    def test_falls_back_to_database(self):
+        """Без кешей сессия читается из базы и снова кешируется."""
+        client = Client()
+        client.force_login(SessionStoreTest.user)
+        cache.clear()
+        forget(client.session.session_key)
+        self.assertEqual(len(self.session_queries(client)), 1)
+        self.assertEqual(self.session_queries(client), [])
+
+    def test_unchanged_session_not_saved(self):
+        """Сессия, помеченная изменённой, но с теми же данными, не пишется."""
+        session = SessionStore()
+        session['theme'] = 'dark'
+        session.save()
+        session = SessionStore(session.session_key)
+        session['theme'] = 'dark'
+        self.assertTrue(session.modified)
+        with self.assertNumQueries(0):
+            session.save()
+        session['theme'] = 'light'
+        session.save()
+        self.assertEqual(SessionStore(session.session_key)['theme'], 'light')
+
+    def test_logout_forgets_session(self):
+        """После выхода старый ключ сессии не действует."""
+        client = Client()
+        client.force_login(SessionStoreTest.user)
+        session_key = client.session.session_key
+        client.get(reverse('users:logout'))
+        self.assertFalse(SessionStore().exists(session_key))
+        self.assertNotIn('_auth_user_id', SessionStore(session_key).load())
+
+    @override_settings(SESSION_CLEANUP_BATCH_SIZE=2)
+    def test_expired_sessions_cleared_in_batches(self):
+        """Истёкшие сессии удаляются пачками, живые остаются."""
+        past = timezone.now() - timedelta(days=1)
+        for number in range(5):
+            Session.objects.create(session_key=f'expired{number}',
+                                   session_data='', expire_date=past)
+        Session.objects.create(session_key='alive', session_data='',
+                               expire_date=timezone.now() + timedelta(1))
+        out = StringIO()
+        with CaptureQueriesContext(connection) as captured:
+            call_command('expire_sessions', stdout=out)
+        deletes = [query for query in captured
+                   if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 3)
+        self.assertIn('5', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list(
+            'session_key', flat=True)), ['alive'])
@@ -0,0 +1,113 @@
+import shutil
+import tempfile
+import time
+
+from django.http import HttpResponse
+from django.test import SimpleTestCase
+
+from core.cache import FileBasedCache, LocalRedisServer, RedisCache
+
+
+def redis_cache(server, prefix='yatube'):
+    return RedisCache(server.url, {'KEY_PREFIX': prefix,
+                                   'OPTIONS': {'COMPRESS_MIN_LENGTH': 100}})
+
+
+class RedisCacheTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = LocalRedisServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.data.clear()
+        self.cache = redis_cache(self.server)
+
+    def test_shared_between_processes(self):
+        """Значение, записанное одним процессом, видно другому."""
+        self.cache.set('page', {'text': 'Пост'})
+        other = redis_cache(self.server)
+        self.assertEqual(other.get('page'), {'text': 'Пост'})
+        other.delete('page')
+        self.assertIsNone(self.cache.get('page'))
+
+    def test_cache_api(self):
+        """Операции кеша Django работают поверх протокола Redis."""
+        self.cache.set_many({'a': 1, 'b': 'два'})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 'два'})
+        self.assertEqual(self.cache.incr('a', 5), 6)
+        with self.assertRaises(ValueError):
+            self.cache.incr('c')
+        self.assertFalse(self.cache.add('b', 'три'))
+        self.assertTrue(self.cache.add('c', 'три'))
+        self.assertEqual(self.cache.get_or_set('d', 'четыре'), 'четыре')
+        self.cache.delete_many(['a', 'b'])
+        self.assertFalse(self.cache.has_key('a'))
+
+    def test_timeout(self):
+        """Значения живут не дольше timeout."""
+        self.cache.set('short', 'значение', timeout=0.05)
+        self.cache.set('forever', 'значение', timeout=None)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('forever'), 'значение')
+
+    def test_large_values_compressed(self):
+        """Большие страницы хранятся сжатыми, маленькие — как есть."""
+        page = HttpResponse('<p>Пост</p>' * 1000)
+        self.cache.set('page', page)
+        self.cache.set('small', 'значение')
+        stored = self.server.data[self.cache.make_key('page').encode()][0]
+        self.assertLess(len(stored), len(page.content))
+        self.assertEqual(stored[:1], b'z')
+        self.assertEqual(self.cache.get('page').content, page.content)
+        self.assertEqual(
+            self.server.data[self.cache.make_key('small').encode()][0][:1],
+            b'p')
+
+    def test_clear_keeps_other_namespaces(self):
+        """clear() удаляет только ключи своего префикса."""
+        other = redis_cache(self.server, prefix='other')
+        self.cache.set('key', 1)
+        other.set('key', 2)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(other.get('key'), 2)
+
+    def test_metrics(self):
+        """Счётчики попаданий процесса и общие счётчики сервера."""
+        self.cache.set('key', 1)
+        self.cache.get('key')
+        self.cache.get_many(['key', 'missing'])
+        metrics = self.cache.metrics()
+        self.assertEqual((metrics['hits'], metrics['misses']), (2, 1))
+        self.assertEqual(metrics['hit_ratio'], 0.667)
+        self.assertGreaterEqual(metrics['server_hits'], 2)
+
+    def test_reconnects(self):
+        """Оборванное соединение открывается заново."""
+        self.cache.set('key', 1)
+        self.cache._local.socket.close()
+        self.assertEqual(self.cache.get('key'), 1)
+
+
+class FileBasedCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_shared_directory_with_metrics(self):
+        """Кеш в каталоге общий для процессов и считает попадания."""
+        first = FileBasedCache(self.directory, {})
+        second = FileBasedCache(self.directory, {})
+        first.set('key', 'значение')
+        self.assertEqual(second.get('key'), 'значение')
+        second.get('missing')
+        self.assertEqual(second.metrics(), {
+            'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
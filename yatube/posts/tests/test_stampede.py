@@ -0,0 +1,109 @@
+import hashlib
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts.cache import bump_generation, cache_feed
+from posts.models import Post
+
+User = get_user_model()
+
+CONCURRENT_REQUESTS: int = 10
+
+
+class CacheStampedeTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+        self.lock = threading.Lock()
+
+        @cache_feed('index')
+        def view(request):
+            with self.lock:
+                self.builds += 1
+                build = self.builds
+            time.sleep(0.2)
+            return HttpResponse(f'Сборка {build}')
+
+        self.view = view
+
+    def get(self):
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        return self.view(request).content.decode()
+
+    def get_concurrently(self):
+        """Одновременные запросы из потоков, ответы по порядку потоков."""
+        barrier = threading.Barrier(CONCURRENT_REQUESTS)
+        responses = [None] * CONCURRENT_REQUESTS
+
+        def run(number):
+            barrier.wait()
+            responses[number] = self.get()
+
+        threads = [threading.Thread(target=run, args=(number,))
+                   for number in range(CONCURRENT_REQUESTS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_cold_cache_built_once(self):
+        """Пустой кеш под нагрузкой: страницу собирает один запрос."""
+        responses = self.get_concurrently()
+        self.assertEqual(self.builds, 1)
+        self.assertEqual(set(responses), {'Сборка 1'})
+
+    def test_stale_served_while_rebuilding(self):
+        """После смены поколения один пересобирает, прочие получают старую."""
+        self.get()
+        bump_generation('index')
+        responses = self.get_concurrently()
+        self.assertEqual(self.builds, 2)
+        self.assertEqual(set(responses), {'Сборка 1', 'Сборка 2'})
+        self.assertEqual(responses.count('Сборка 2'), 1)
+        self.assertEqual(self.get(), 'Сборка 2')
+
+    def test_early_expiration(self):
+        """Незадолго до срока страница пересобирается заранее."""
+        self.get()
+        with mock.patch('posts.cache.random.random', return_value=0.0):
+            self.assertEqual(self.get(), 'Сборка 1')
+        with mock.patch('posts.cache.random.random', return_value=0.999), \
+                self.settings(FEED_EARLY_EXPIRATION_BETA=1e9):
+            self.assertEqual(self.get(), 'Сборка 2')
+
+
+class StaleValidatorsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+
+    def test_stale_page_sent_without_validators(self):
+        """Прежняя страница во время пересборки уходит без ETag, и её
+        нельзя подтвердить ответом 304."""
+        url = reverse('posts:index')
+        old_etag = self.client.get(url)['ETag']
+        Post.objects.create(author=self.author, text='Новый пост')
+        key = 'feed:0:' + hashlib.md5(
+            f'http://testserver{url}'.encode()).hexdigest()
+        cache.add(f'{key}:rebuild', 1)
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Новый пост')
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=old_etag)
+        self.assertEqual(response.status_code, 200)
+        cache.delete(f'{key}:rebuild')
+        response = self.client.get(url)
+        self.assertContains(response, 'Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
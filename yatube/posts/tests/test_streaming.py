@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+POSTS: int = 13
+
+
+@override_settings(FEED_STREAMING=True)
+class StreamingFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='reader')
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Текст')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(POSTS):
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост номер {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(StreamingFeedTest.user)
+
+    def test_feeds_streamed(self):
+        """Ленты отдаются потоком: шапка первой, затем посты."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=['test-slug']),
+            reverse('posts:profile', args=['author']),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.streaming)
+                chunks = [chunk.decode()
+                          for chunk in response.streaming_content]
+                self.assertIn('<header', chunks[0])
+                self.assertNotIn('Пост номер', chunks[0])
+                page = ''.join(chunks)
+                self.assertEqual(page.count('Пост номер'), 10)
+                self.assertIn('Пост номер 12', page)
+                self.assertIn('</html>', chunks[-1])
+
+    def test_streamed_page_cached_whole(self):
+        """Отправленная целиком страница попадает в кеш."""
+        response = self.client.get(reverse('posts:index'))
+        streamed = b''.join(response.streaming_content)
+        # Остаётся только запрос пользователя.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, streamed)
+
+    def test_context_available(self):
+        """Контекст страницы доступен, как и при обычном render()."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 10)
@@ -0,0 +1,160 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+
+from posts import thumbnails
+from posts.models import Post, Thumbnail
+from posts.thumbnails import (FEED_GEOMETRY, FEED_OPTIONS, PROFILES,
+                              generate_thumbnail, geometries,
+                              ready_thumbnail, schedule_thumbnail,
+                              thumbnail_set)
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+small_gif = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B')
+PLACEHOLDER = 'bg-light'
+
+
+def uploaded_gif(name='small.gif'):
+    return SimpleUploadedFile(name=name, content=small_gif,
+                              content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ThumbnailTests.user)
+
+    def test_thumbnail_created_on_upload(self):
+        """Миниатюра создаётся при публикации поста с картинкой."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded_gif()})
+        post = Post.objects.get(text='Пост с картинкой')
+        thumbnail = ready_thumbnail(post.image)
+        self.assertIsNotNone(thumbnail)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+        self.assertNotContains(response, PLACEHOLDER)
+
+    def test_placeholder_until_regenerated(self):
+        """Без миниатюры показывается заглушка, команда создаёт миниатюры."""
+        post = Post.objects.create(author=ThumbnailTests.user,
+                                   text='Старый пост', image=uploaded_gif())
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, PLACEHOLDER)
+        out = StringIO()
+        call_command('regenerate_thumbnails', workers=2, stdout=out)
+        self.assertIn('Создано: 1', out.getvalue())
+        thumbnail = ready_thumbnail(post.image)
+        self.assertIsNotNone(thumbnail)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+
+    def test_srcset_for_profiles(self):
+        """Лента и страница поста получают srcset и sizes своих профилей."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded_gif()})
+        post = Post.objects.get(text='Пост с картинкой')
+        feed = thumbnail_set(post.image, 'feed')
+        self.assertEqual(len(feed['srcset'].split(', ')),
+                         len(PROFILES['feed']['widths']))
+        for width in PROFILES['feed']['widths']:
+            self.assertIn(f' {width}w', feed['srcset'])
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, f'srcset="{feed["srcset"]}"')
+        self.assertContains(response, f'sizes="{PROFILES["feed"]["sizes"]}"')
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+        self.assertContains(
+            response, f'sizes="{PROFILES["detail"]["sizes"]}"')
+
+    def test_thumbnail_set_cached(self):
+        """Готовый набор берётся из кеша, без чтения записей миниатюр."""
+        post = Post.objects.create(author=ThumbnailTests.user,
+                                   text='Пост', image=uploaded_gif())
+        generate_thumbnail(post.image.name)
+        expected = thumbnail_set(post.image, 'feed')
+        with mock.patch('posts.thumbnails.ready_thumbnails') as ready:
+            self.assertEqual(thumbnail_set(post.image, 'feed'), expected)
+        ready.assert_not_called()
+
+    def test_ready_thumbnail_read_from_records(self):
+        """Готовая миниатюра находится по записи, без хранилища sorl."""
+        post = Post.objects.create(author=ThumbnailTests.user,
+                                   text='Пост', image=uploaded_gif())
+        self.assertIsNone(ready_thumbnail(post.image))
+        generate_thumbnail(post.image.name)
+        expected = get_thumbnail(post.image.name, FEED_GEOMETRY,
+                                 **FEED_OPTIONS)
+        with mock.patch.object(default.kvstore, 'get',
+                               side_effect=AssertionError):
+            thumbnail = ready_thumbnail(post.image)
+        self.assertEqual(thumbnail.url, expected.url)
+        self.assertEqual(thumbnail.size, expected.size)
+
+    def test_rolled_back_post_not_pending(self):
+        """Миниатюра поста, чья транзакция не закоммичена, не ждёт в
+        очереди: при откате отметка не остаётся."""
+        post = Post.objects.create(author=ThumbnailTests.user,
+                                   text='Пост', image=uploaded_gif())
+        with mock.patch('posts.thumbnails.threads_allowed',
+                        return_value=True):
+            schedule_thumbnail(post)
+        self.assertNotIn(post.image.name, thumbnails._pending)
+
+    def test_posts_sharing_image_updated(self):
+        """Созданные миниатюры обновляют все посты с этой картинкой."""
+        post = Post.objects.create(author=ThumbnailTests.user,
+                                   text='Пост', image=uploaded_gif())
+        same = Post.objects.create(author=ThumbnailTests.user,
+                                   text='Та же картинка',
+                                   image=post.image.name)
+        updated = Post.objects.get(pk=same.pk).updated
+        generate_thumbnail(post.image.name)
+        self.assertGreater(Post.objects.get(pk=same.pk).updated, updated)
+
+    def test_narrow_image_not_upscaled_in_srcset(self):
+        """Узкая картинка без увеличения даёт одну ширину в srcset."""
+        file = BytesIO()
+        Image.new('RGB', (300, 200), 'red').save(file, 'JPEG')
+        post = Post.objects.create(
+            author=ThumbnailTests.user, text='Узкая картинка',
+            image=SimpleUploadedFile('narrow.jpg', file.getvalue()))
+        generate_thumbnail(post.image.name)
+        detail = thumbnail_set(post.image, 'detail')
+        self.assertEqual(detail['srcset'], f'{detail["src"]} 300w')
+        self.assertEqual(Thumbnail.objects.filter(
+            image=post.image.name, geometry__in=[
+                geometry for _, geometry, _ in geometries('detail')],
+        ).count(), 1)
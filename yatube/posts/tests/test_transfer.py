@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts.models import AuthorStats, Comment, FeedEntry, Follow, Group, Post
+from posts.search import search_post_ids
+
+User = get_user_model()
+KINDS = ('groups', 'posts', 'comments', 'follows')
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user')
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Текст')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост')
+        Post.objects.filter(pk=cls.post.pk).update(
+            pub_date=datetime(2020, 1, 2, tzinfo=timezone.utc))
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text='Комментарий')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def round_trip(self, extension):
+        """Выгружает всё, очищает таблицы и загружает обратно."""
+        paths = {kind: os.path.join(self.directory, f'{kind}.{extension}')
+                 for kind in KINDS}
+        for kind, path in paths.items():
+            call_command('export_data', kind, path, '--batch-size=1',
+                         stderr=StringIO())
+        Group.objects.all().delete()
+        User.objects.all().delete()
+        for kind, path in paths.items():
+            call_command('import_data', kind, path, '--batch-size=1',
+                         stderr=StringIO())
+
+    def check_restored(self):
+        post = Post.objects.select_related('author', 'group').get()
+        self.assertEqual(post.pk, TransferTest.post.pk)
+        self.assertEqual(post.author.username, 'author')
+        self.assertEqual(post.group.slug, 'test-slug')
+        self.assertEqual(post.pub_date,
+                         datetime(2020, 1, 2, tzinfo=timezone.utc))
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.comments.get().author.username, 'user')
+        self.assertTrue(Follow.objects.filter(
+            user__username='user', author__username='author').exists())
+        self.assertTrue(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(AuthorStats.objects.get(
+            user__username='author').followers_count, 1)
+        self.assertEqual(search_post_ids('тестовый', 0, 10), [post.pk])
+
+    def test_jsonl_round_trip(self):
+        """JSON Lines: данные, даты, счётчики, ленты и индекс восстановлены."""
+        self.round_trip('jsonl')
+        self.check_restored()
+
+    def test_csv_round_trip(self):
+        """CSV: данные, даты, счётчики, ленты и индекс восстановлены."""
+        self.round_trip('csv')
+        self.check_restored()
+
+    def test_import_is_repeatable(self):
+        """Повторная загрузка не создаёт дублей."""
+        path = os.path.join(self.directory, 'posts.jsonl')
+        call_command('export_data', 'posts', path, stderr=StringIO())
+        call_command('import_data', 'posts', path, stderr=StringIO())
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_import_reports_conflicts(self):
+        """Строки с id, занятым другими данными, не загружаются."""
+        paths = {kind: os.path.join(self.directory, f'{kind}.jsonl')
+                 for kind in ('posts', 'comments')}
+        for kind, path in paths.items():
+            call_command('export_data', kind, path, stderr=StringIO())
+        pk = TransferTest.post.pk
+        Post.objects.filter(pk=pk).delete()
+        Post.objects.create(pk=pk, author=TransferTest.user, text='Другой')
+        for kind, path in paths.items():
+            with self.subTest(kind=kind):
+                stderr = StringIO()
+                with self.assertRaises(CommandError):
+                    call_command('import_data', kind, path, stderr=stderr)
+                self.assertIn('Загружено: 0 из 1', stderr.getvalue())
+        self.assertEqual(Post.objects.get(pk=pk).text, 'Другой')
+        self.assertFalse(FeedEntry.objects.filter(post=pk).exists())
+        self.assertFalse(Comment.objects.exists())
@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, User
+
+
+class UnreadCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.stranger = User.objects.create(username='stranger')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(UnreadCountTest.reader)
+        self.reader_client.get(reverse('posts:follow_index'))
+
+    def unread(self, client=None):
+        response = (client or self.reader_client).get(
+            reverse('posts:follow_unread'))
+        return response.json()['unread']
+
+    def test_new_posts_counted_for_followers(self):
+        """Новые посты автора попадают только в счётчик подписчиков."""
+        self.assertEqual(self.unread(), 0)
+        Post.objects.create(author=UnreadCountTest.author, text='Первый')
+        Post.objects.create(author=UnreadCountTest.author, text='Второй')
+        self.assertEqual(self.unread(), 2)
+        stranger_client = Client()
+        stranger_client.force_login(UnreadCountTest.stranger)
+        self.assertEqual(self.unread(stranger_client), 0)
+
+    def test_visit_resets_counter(self):
+        """Просмотр ленты обнуляет счётчик."""
+        Post.objects.create(author=UnreadCountTest.author, text='Новый')
+        self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(self.unread(), 0)
+
+    def test_deleted_unseen_post_uncounted(self):
+        """Удалённый непрочитанный пост уходит из счётчика, старый — нет."""
+        post = Post.objects.create(author=UnreadCountTest.author, text='Новый')
+        post.delete()
+        self.assertEqual(self.unread(), 0)
+        Post.objects.create(author=UnreadCountTest.author, text='Новый')
+        UnreadCountTest.old_post.delete()
+        self.assertEqual(self.unread(), 1)
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_heavy_author_counted(self):
+        """Посты авторов без раскладки по лентам тоже считаются."""
+        Post.objects.create(author=UnreadCountTest.author, text='Новый')
+        self.assertEqual(self.unread(), 1)
+
+    def test_counter_without_posts_query(self):
+        """Счётчик читается из одной строки, без запросов к постам."""
+        with self.assertNumQueries(2):
+            self.unread()
+
+    def test_badge_in_header(self):
+        """Значок в шапке только у вошедших пользователей."""
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertContains(response, reverse('posts:follow_unread'))
+        response = Client().get(reverse('posts:index'))
+        self.assertNotContains(response, reverse('posts:follow_unread'))
@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.models import User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def upload(size=(100, 50), fmt='JPEG', mode='RGB', color='red', **params):
+    file = BytesIO()
+    Image.new(mode, size, color).save(file, fmt, **params)
+    return SimpleUploadedFile(f'image.{fmt.lower()}', file.getvalue(),
+                              content_type=f'image/{fmt.lower()}')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, UPLOAD_IMAGE_MAX_SIDE=200)
+class UploadPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(UploadPipelineTest.user)
+
+    def save(self, image):
+        form = PostForm({'text': 'Пост'}, files={'image': image})
+        self.assertTrue(form.is_valid(), form.errors)
+        form.instance.author = UploadPipelineTest.user
+        return form.save()
+
+    def stored(self, post):
+        return Image.open(os.path.join(TEMP_MEDIA_ROOT, post.image.name))
+
+    def test_large_image_downscaled_and_reencoded(self):
+        """Большая картинка уменьшается и сохраняется прогрессивным JPEG."""
+        post = self.save(upload(size=(1000, 500), fmt='PNG'))
+        image = self.stored(post)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (200, 100))
+        self.assertTrue(image.info.get('progressive'))
+
+    def test_transparent_image_kept_as_png(self):
+        """Прозрачность сохраняется в PNG."""
+        post = self.save(upload(fmt='PNG', mode='RGBA',
+                                color=(255, 0, 0, 0)))
+        image = self.stored(post)
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.mode, 'RGBA')
+
+    def test_same_image_shares_file(self):
+        """Одинаковые загрузки ссылаются на один файл."""
+        directory = os.path.join(TEMP_MEDIA_ROOT, 'posts')
+        first = self.save(upload(color='blue'))
+        files = len(os.listdir(directory))
+        second = self.save(upload(color='blue'))
+        third = self.save(upload(color='green'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, third.image.name)
+        self.assertEqual(len(os.listdir(directory)), files + 1)
+
+    def test_limits(self):
+        """Слишком большие файлы и разрешения отклоняются."""
+        with self.settings(UPLOAD_IMAGE_MAX_SIZE=100):
+            form = PostForm({'text': 'Пост'}, files={
+                'image': upload(size=(300, 300), fmt='BMP')})
+            self.assertIn('image', form.errors)
+        with self.settings(UPLOAD_IMAGE_MAX_PIXELS=100):
+            form = PostForm({'text': 'Пост'}, files={'image': upload()})
+            self.assertIn('image', form.errors)
+
+    def test_edit_keeps_or_replaces_image(self):
+        """Правка без файла оставляет картинку, с файлом — заменяет."""
+        post = self.save(upload(color='white'))
+        self.client.post(reverse('posts:post_edit', args=[post.pk]),
+                         {'text': 'Новый текст'})
+        post.refresh_from_db()
+        old_name = post.image.name
+        self.assertTrue(old_name)
+        self.client.post(reverse('posts:post_edit', args=[post.pk]),
+                         {'text': 'Новый текст', 'image': upload(
+                             color='black')})
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertTrue(post.image.name.endswith('.jpg'))
+
+    def test_invalid_form_stores_nothing(self):
+        """Картинка из формы с ошибками не сохраняется."""
+        directory = os.path.join(TEMP_MEDIA_ROOT, 'posts')
+        os.makedirs(directory, exist_ok=True)
+        files = len(os.listdir(directory))
+        self.client.post(reverse('posts:post_create'),
+                         {'text': '', 'image': upload(color='yellow')})
+        self.assertEqual(len(os.listdir(directory)), files)
+
+    def test_create_shows_image_errors(self):
+        """Страница создания поста показывает ошибку картинки."""
+        with self.settings(UPLOAD_IMAGE_MAX_PIXELS=100):
+            response = self.client.post(reverse('posts:post_create'),
+                                        {'text': 'Пост', 'image': upload()})
+        self.assertIn('image', response.context['form'].errors)
+        self.assertContains(response, 'Слишком большое разрешение')
@@ -3,10 +3,14 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from posts.cache import bump_generation
 from posts.models import Group, Post, Follow
+from posts.utils import CursorPaginator
 
 User = get_user_model()
 TEST_OF_POST: int = 13
@@ -47,6 +51,7 @@ class PostModelTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(PostModelTest.user)
         self.author = Client()
@@ -202,6 +207,62 @@ class PostModelTest(TestCase):
         self.assertEqual(content_before, content_after)
         self.assertEqual(post_count, post_count_after + 1)
 
+    def test_cache_invalidated_by_new_post(self):
+        """Новый пост сразу виден на закешированных страницах."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    kwargs={'slug': f'{PostModelTest.group.slug}'}),
+            reverse('posts:profile',
+                    kwargs={'username': f'{PostModelTest.author}'}),
+        )
+        for page in pages:
+            self.authorized_client.get(page)
+        new_post = Post.objects.create(
+            author=PostModelTest.author,
+            group=PostModelTest.group,
+            text='Свежий пост',
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.authorized_client.get(page)
+                self.assertContains(response, new_post.text)
+
+    def test_cache_kept_for_unchanged_scope(self):
+        """Пост другого автора не сбрасывает кеш профиля."""
+        page = reverse('posts:profile',
+                       kwargs={'username': f'{PostModelTest.author}'})
+        response = self.authorized_client.get(page)
+        self.assertIsNotNone(response.context)
+        Post.objects.create(author=PostModelTest.user, text='Чужой пост')
+        response = self.authorized_client.get(page)
+        self.assertIsNone(response.context)
+
+    def test_post_card_fragment_reused_until_edit(self):
+        """Карточка поста берётся из кеша до редактирования поста."""
+        post = PostModelTest.post
+        self.authorized_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=post.pk).update(text='Изменено тайком')
+        bump_generation('index')
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, post.text)
+        self.assertNotContains(response, 'Изменено тайком')
+        self.author.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': 'Отредактированный пост'})
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Отредактированный пост')
+
+    def test_post_card_fragment_follows_renames(self):
+        """Ссылки карточки обновляются после смены имени автора."""
+        self.authorized_client.get(reverse('posts:index'))
+        author = User.objects.get(pk=PostModelTest.post.author_id)
+        author.username = 'renamed'
+        author.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, reverse(
+            'posts:profile', kwargs={'username': 'renamed'}))
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -248,3 +309,61 @@ class PaginatorViewsTest(TestCase):
             self.assertEqual(count_posts2,
                              TEST_OF_POST - settings.POSTS_COUNT,
                              error_name2)
+
+    def test_cursor_pages_walk_whole_feed(self):
+        '''Курсоры ведут по ленте без пропусков и повторов.'''
+        cache.clear()
+        response1 = self.guest_client.get(reverse('posts:index'))
+        page1 = response1.context['page_obj']
+        self.assertTrue(page1.has_next())
+        self.assertFalse(page1.has_previous())
+        response2 = self.guest_client.get(
+            reverse('posts:index') + f'?cursor={page1.next_cursor}')
+        page2 = response2.context['page_obj']
+        self.assertEqual(len(page2), TEST_OF_POST - settings.POSTS_COUNT)
+        self.assertFalse(page2.has_next())
+        self.assertTrue(page2.has_previous())
+        ids = [post.id for post in list(page1) + list(page2)]
+        self.assertEqual(len(set(ids)), TEST_OF_POST)
+        response3 = self.guest_client.get(
+            reverse('posts:index') + f'?cursor={page2.previous_cursor}')
+        self.assertEqual(list(response3.context['page_obj']), list(page1))
+
+    def test_cursor_page_skips_count_query(self):
+        '''Страница по курсору не выполняет COUNT(*).'''
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse(
+                'posts:group_list',
+                kwargs={'slug': f'{PaginatorViewsTest.group.slug}'}))
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries))
+
+    def test_broken_cursor_opens_first_page(self):
+        '''Некорректный курсор открывает первую страницу.'''
+        cache.clear()
+        response = self.guest_client.get(
+            reverse('posts:index') + '?cursor=broken')
+        self.assertEqual(len(response.context['page_obj']),
+                         settings.POSTS_COUNT)
+
+    def test_numbered_page_counts_once(self):
+        '''Страница по номеру берёт COUNT(*) из кеша, а не на каждый запрос.'''
+        cache.clear()
+        CursorPaginator(Post.objects.all(), settings.POSTS_COUNT).lazy_page(1)
+        with CaptureQueriesContext(connection) as queries:
+            page = CursorPaginator(
+                Post.objects.all(), settings.POSTS_COUNT).lazy_page(1)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(page.has_next())
+        self.assertEqual(list(page.page_window), [1, 2])
+        self.assertEqual(page.last_page_number, 2)
+
+    def test_numbered_page_out_of_range(self):
+        '''Номер за концом ленты открывает последнюю страницу.'''
+        cache.clear()
+        response = self.guest_client.get(reverse('posts:index') + '?page=99')
+        page = response.context['page_obj']
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), TEST_OF_POST - settings.POSTS_COUNT)
+        self.assertFalse(page.has_next())
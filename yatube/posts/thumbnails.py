@@ -0,0 +1,232 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from core.profiling import phase
+
+from .cache import bump_generation, post_scopes
+from .models import Post, Thumbnail
+
+logger = logging.getLogger(__name__)
+
+FEED_GEOMETRY = '960x339'
+FEED_OPTIONS = {'crop': 'center', 'upscale': True}
+# Профили миниатюр по месту показа: ширины набора для srcset, высота как
+# доля ширины (None — по пропорциям картинки) и атрибут sizes.
+PROFILES = {
+    'feed': {
+        'widths': (320, 640, 960),
+        'ratio': 339 / 960,
+        'sizes': '(max-width: 960px) 100vw, 960px',
+    },
+    'detail': {
+        'widths': (480, 960, 1440),
+        'ratio': None,
+        'sizes': '(max-width: 768px) 100vw, 75vw',
+    },
+}
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _image_file(name, width, height):
+    thumbnail = ImageFile(name, default.storage)
+    thumbnail.set_size((width, height))
+    return thumbnail
+
+
+def ready_thumbnails(image):
+    """Записанные миниатюры картинки одним запросом: геометрия -> файл."""
+    if not image:
+        return {}
+    with phase('thumbnail'):
+        rows = Thumbnail.objects.filter(
+            image=getattr(image, 'name', image),
+        ).values_list('geometry', 'name', 'width', 'height')
+        return {geometry: _image_file(name, width, height)
+                for geometry, name, width, height in rows}
+
+
+def ready_thumbnail(image, geometry=FEED_GEOMETRY):
+    """Готовая миниатюра картинки или None, без генерации."""
+    return ready_thumbnails(image).get(geometry)
+
+
+def record_thumbnails(image_name, thumbnails):
+    """Запоминает созданные миниатюры картинки: геометрия -> файл sorl."""
+    with transaction.atomic():
+        Thumbnail.objects.filter(image=image_name).delete()
+        Thumbnail.objects.bulk_create([
+            Thumbnail(image=image_name, geometry=geometry,
+                      name=thumbnail.name, width=thumbnail.width,
+                      height=thumbnail.height)
+            for geometry, thumbnail in thumbnails.items()
+        ])
+
+
+def geometries(profile):
+    """Тройки (ширина, геометрия sorl, опции) набора миниатюр профиля."""
+    ratio = PROFILES[profile]['ratio']
+    for width in PROFILES[profile]['widths']:
+        if ratio is None:
+            yield width, f'{width}', {'upscale': False}
+        else:
+            yield width, f'{width}x{round(width * ratio)}', FEED_OPTIONS
+
+
+def _thumbnails_key(image_name, profile):
+    return f'thumbnails:{profile}:{image_name}'
+
+
+def _collect_set(ready, profile):
+    """src, srcset и sizes профиля из записанных миниатюр или None.
+
+    Миниатюры записываются разом по окончании генерации, поэтому набор
+    есть целиком или его нет. Одинаковые ширины попадают в srcset один
+    раз.
+    """
+    thumbnails = [ready[geometry] for _, geometry, _ in geometries(profile)
+                  if geometry in ready]
+    if not thumbnails:
+        return None
+    srcset = {}
+    for thumbnail in thumbnails:
+        srcset.setdefault(thumbnail.width, thumbnail.url)
+    largest = thumbnails[-1]
+    return {
+        'src': largest.url,
+        'srcset': ', '.join(f'{url} {width}w'
+                            for width, url in srcset.items()),
+        'sizes': PROFILES[profile]['sizes'],
+        'width': largest.width,
+        'height': largest.height,
+    }
+
+
+def thumbnail_set(image, profile):
+    """src, srcset и sizes миниатюр картинки для профиля или None.
+
+    Набор кешируется по имени файла, и страница обращается не к записям
+    миниатюр, а один раз к кешу. Пока миниатюр нет, в кеше ненадолго
+    остаётся пустой набор.
+    """
+    if not image:
+        return None
+    image_name = getattr(image, 'name', image)
+    key = _thumbnails_key(image_name, profile)
+    found = cache.get(key)
+    if found is None:
+        found = _collect_set(ready_thumbnails(image_name), profile) or {}
+        cache.set(key, found, settings.THUMBNAIL_URLS_TIMEOUT if found
+                  else settings.THUMBNAIL_PENDING_TIMEOUT)
+    return found or None
+
+
+def thumbnails_ready(image_name):
+    """Созданы ли миниатюры всех профилей."""
+    ready = ready_thumbnails(image_name)
+    return all(_collect_set(ready, profile) for profile in PROFILES)
+
+
+def generate_thumbnail(image_name):
+    """Создаёт миниатюры всех профилей и сбрасывает кеш карточек и лент.
+
+    Ширины профиля больше самой картинки пропускаются, если профиль её
+    не увеличивает. Одинаковые картинки хранятся одним файлом, поэтому
+    сбрасываются все посты с этой картинкой.
+    """
+    thumbnails = {}
+    try:
+        with phase('thumbnail'):
+            for profile in PROFILES:
+                for width, geometry, options in geometries(profile):
+                    thumbnail = get_thumbnail(image_name, geometry, **options)
+                    thumbnails[geometry] = thumbnail
+                    if thumbnail.width < width:
+                        # Картинка уже оригинальной ширины: без увеличения
+                        # следующие ширины дали бы тот же файл.
+                        break
+            record_thumbnails(image_name, thumbnails)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', image_name)
+        return False
+    finally:
+        with _lock:
+            _pending.discard(image_name)
+    cache.delete_many([_thumbnails_key(image_name, profile)
+                       for profile in PROFILES])
+    if not thumbnails_ready(image_name):
+        return False
+    posts = Post.objects.filter(image=image_name)
+    posts.update(updated=timezone.now())
+    scopes = set()
+    for post in posts.select_related('author', 'group'):
+        scopes.update(post_scopes(post))
+    if scopes:
+        bump_generation(*scopes)
+    return True
+
+
+def generate_in_thread(image_name):
+    """generate_thumbnail для пула потоков: закрывает соединение с БД."""
+    try:
+        return generate_thumbnail(image_name)
+    finally:
+        connection.close()
+
+
+def threads_allowed():
+    """Можно ли создавать миниатюры в фоновых потоках.
+
+    БД SQLite в памяти потоки делят через общий кеш с блокировками таблиц,
+    поэтому с ней, как и при THUMBNAIL_WORKERS = 0, миниатюры создаются
+    сразу в вызывающем потоке.
+    """
+    return bool(settings.THUMBNAIL_WORKERS) and not (
+        connection.vendor == 'sqlite' and connection.is_in_memory_db())
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def _start_thumbnail(image_name):
+    """Запускает создание миниатюр картинки, если оно ещё не идёт."""
+    with _lock:
+        if image_name in _pending:
+            return
+        _pending.add(image_name)
+    if threads_allowed():
+        _get_executor().submit(generate_in_thread, image_name)
+    else:
+        generate_thumbnail(image_name)
+
+
+def schedule_thumbnail(post):
+    """Ставит создание миниатюры поста в фоновую очередь.
+
+    В очередь, как и в _pending, картинка попадает только после коммита:
+    при откате транзакции её не ждут вечно.
+    """
+    if not post.image:
+        return
+    image_name = post.image.name
+    if not threads_allowed():
+        _start_thumbnail(image_name)
+        return
+    transaction.on_commit(lambda: _start_thumbnail(image_name))
@@ -0,0 +1,111 @@
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+UPLOAD_DIR = 'posts'
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+
+def content_hash(upload):
+    """SHA-256 загруженного файла, прочитанного по частям."""
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stored_name(digest):
+    """Имя уже сохранённой картинки с этим содержимым или None."""
+    for extension in EXTENSIONS.values():
+        name = f'{UPLOAD_DIR}/{digest}.{extension}'
+        if default_storage.exists(name):
+            return name
+    return None
+
+
+def has_transparency(image):
+    if image.mode == 'P':
+        return 'transparency' in image.info
+    if image.mode in ('RGBA', 'LA'):
+        return image.getchannel('A').getextrema()[0] < 255
+    return False
+
+
+def encode(image):
+    """Картинка в формате UPLOAD_IMAGE_FORMAT: (формат, байты).
+
+    JPEG не хранит прозрачность, поэтому такие картинки сохраняются
+    в PNG.
+    """
+    output = BytesIO()
+    fmt = settings.UPLOAD_IMAGE_FORMAT
+    if fmt == 'JPEG' and has_transparency(image):
+        fmt = 'PNG'
+    if fmt == 'PNG' or (fmt == 'WEBP' and has_transparency(image)):
+        image.convert('RGBA').save(output, fmt, optimize=True,
+                                   quality=settings.UPLOAD_IMAGE_QUALITY)
+    else:
+        image.convert('RGB').save(output, fmt, optimize=True,
+                                  progressive=True,
+                                  quality=settings.UPLOAD_IMAGE_QUALITY)
+    return fmt, output.getvalue()
+
+
+def check_image(upload):
+    """Проверяет размер файла и разрешение по заголовку картинки.
+
+    Пиксели не декодируются и ничего не сохраняется: это делает
+    process_image, когда форма уже прошла проверку.
+    """
+    if upload.size > settings.UPLOAD_IMAGE_MAX_SIZE:
+        raise ValidationError(
+            'Файл больше %(limit)d МБ.',
+            params={'limit': settings.UPLOAD_IMAGE_MAX_SIZE // 2 ** 20},
+            code='file_too_large')
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+        if image.width * image.height > settings.UPLOAD_IMAGE_MAX_PIXELS:
+            raise ValidationError('Слишком большое разрешение картинки.',
+                                  code='too_many_pixels')
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise ValidationError('Не удалось прочитать картинку.',
+                              code='invalid_image') from exc
+    finally:
+        upload.seek(0)
+
+
+def process_image(upload):
+    """Сохраняет проверенную картинку поста и возвращает имя файла.
+
+    Файл называется по хешу содержимого, поэтому повторная загрузка той
+    же картинки не декодируется и не занимает места: пост ссылается на
+    готовый файл. Новая картинка уменьшается до UPLOAD_IMAGE_MAX_SIDE
+    по большей стороне и перекодируется; анимированные сохраняются как
+    есть. Большие загрузки Django держит во временном файле
+    (FILE_UPLOAD_MAX_MEMORY_SIZE), и в память целиком они не читаются.
+    """
+    digest = content_hash(upload)
+    name = stored_name(digest)
+    if name is not None:
+        return name
+    upload.seek(0)
+    image = Image.open(upload)
+    if getattr(image, 'is_animated', False):
+        upload.seek(0)
+        fmt, content = image.format, upload
+    else:
+        side = settings.UPLOAD_IMAGE_MAX_SIDE
+        # Для JPEG декодирует сразу в уменьшенном масштабе.
+        image.draft('RGB', (side, side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((side, side), Image.LANCZOS)
+        fmt, data = encode(image)
+        content = ContentFile(data)
+    return default_storage.save(
+        f'{UPLOAD_DIR}/{digest}.{EXTENSIONS.get(fmt, "img")}', content)
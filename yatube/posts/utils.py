@@ -1,10 +1,184 @@
+import base64
+import binascii
+import hashlib
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+PAGE_WINDOW = 3
+
+
+def encode_cursor(obj, direction, date_field='pub_date', key_field='pk'):
+    """Непрозрачный курсор по ключу (дата, id) записи."""
+    raw = (f'{direction}|{getattr(obj, date_field).isoformat()}|'
+           f'{getattr(obj, key_field)}')
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор, для некорректного возвращает None."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, date, pk = raw.decode().split('|')
+        date = parse_datetime(date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or date is None:
+        return None
+    return direction, date, pk
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (date_field, key_field), по умолчанию (pub_date, id).
+
+    Страница выбирается условием по ключу последнего показанного поста,
+    поэтому её стоимость не зависит от глубины ленты. Ключ можно задать
+    полями аннотации, если лента читается по индексу другой таблицы.
+    """
+
+    date_field = 'pub_date'
+    key_field = 'pk'
+
+    def __init__(self, object_list, per_page, date_field=None,
+                 key_field=None, **kwargs):
+        self.date_field = date_field or self.date_field
+        self.key_field = key_field or self.key_field
+        super().__init__(
+            object_list.order_by(f'-{self.date_field}',
+                                 f'-{self.key_field}'),
+            per_page, **kwargs)
+
+    @cached_property
+    def count(self):
+        """Примерное число постов: COUNT(*) раз в APPROXIMATE_COUNT_TIMEOUT.
+
+        Точное число нужно только для ссылки на последнюю страницу, поэтому
+        считать его на каждый запрос незачем.
+        """
+        query = str(self.object_list.query).encode()
+        key = f'approximate_count:{hashlib.md5(query).hexdigest()}'
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, settings.APPROXIMATE_COUNT_TIMEOUT)
+        return count
+
+    def lazy_page(self, number):
+        """Страница по номеру без COUNT(*): выбирается на строку больше.
+
+        Лишняя строка показывает, есть ли следующая страница, а ссылки
+        строятся на окно страниц вокруг текущей.
+        """
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        rows = self._rows(number)
+        if not rows and number > 1:
+            number = min(number - 1, self.num_pages)
+            rows = self._rows(number)
+            if not rows:
+                number, rows = 1, self._rows(1)
+        has_next = len(rows) > self.per_page
+        page = Page(rows[:self.per_page], number, self)
+        page.is_lazy = True
+        page.has_next = lambda: has_next
+        page.has_previous = lambda: number > 1
+        page.next_page_number = lambda: number + 1
+        page.previous_page_number = lambda: number - 1
+        last = max(self.num_pages, number + 1) if has_next else number
+        page.page_window = range(max(number - PAGE_WINDOW, 1),
+                                 min(number + PAGE_WINDOW, last) + 1)
+        page.last_page_number = last
+        return page
+
+    def _rows(self, number):
+        bottom = (number - 1) * self.per_page
+        return list(self.object_list[bottom:bottom + self.per_page + 1])
+
+    def cursor_page(self, cursor):
+        """Страница после (или перед) курсором, по умолчанию первая."""
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            return self._first_page()
+        direction, date, pk = decoded
+        field, key = self.date_field, self.key_field
+        if direction == CURSOR_NEXT:
+            rows = list(self.object_list.filter(
+                Q(**{f'{field}__lt': date})
+                | Q(**{field: date, f'{key}__lt': pk})
+            )[:self.per_page + 1])
+            if not rows:
+                return self._first_page()
+            return self._cursor_page(rows[:self.per_page],
+                                     has_next=len(rows) > self.per_page,
+                                     has_previous=True)
+        rows = list(self.object_list.filter(
+            Q(**{f'{field}__gt': date})
+            | Q(**{field: date, f'{key}__gt': pk})
+        ).reverse()[:self.per_page + 1])
+        if not rows:
+            return self._first_page()
+        return self._cursor_page(rows[:self.per_page][::-1],
+                                 has_next=True,
+                                 has_previous=len(rows) > self.per_page)
+
+    def _first_page(self):
+        rows = list(self.object_list[:self.per_page + 1])
+        return self._cursor_page(rows[:self.per_page],
+                                 has_next=len(rows) > self.per_page,
+                                 has_previous=False)
+
+    def _cursor_page(self, rows, has_next, has_previous):
+        """Обычный Page, навигация которого не обращается к count.
+
+        Шаблоны и проверки ожидают именно Page, поэтому вместо подкласса
+        методы навигации переопределяются на самом экземпляре.
+        """
+        page = Page(rows, None, self)
+        page.is_cursor = True
+        page.has_next = lambda: has_next
+        page.has_previous = lambda: has_previous
+        page.next_cursor = encode_cursor(
+            rows[-1], CURSOR_NEXT, self.date_field,
+            self.key_field) if has_next else ''
+        page.previous_cursor = encode_cursor(
+            rows[0], CURSOR_PREVIOUS, self.date_field,
+            self.key_field) if has_previous else ''
+        return page
+
+
+class CommentPaginator(CursorPaginator):
+    """Пагинатор комментариев по ключу (created, id), от новых к старым."""
+
+    date_field = 'created'
+
+
+def get_comments_page(post, cursor=None):
+    """Порция комментариев поста после курсора, по умолчанию первая."""
+    paginator = CommentPaginator(
+        post.comments.select_related('author'), settings.COMMENTS_COUNT)
+    return paginator.cursor_page(cursor)
+
 
+def get_page(posts, request, **page_key):
+    """Страница ленты: по курсору, либо по номеру для старых ссылок.
 
-def get_page(posts, request):
-    paginator = Paginator(posts, settings.POSTS_COUNT)
+    page_key — поля ключа страницы для CursorPaginator, если лента
+    упорядочена не по (pub_date, id).
+    """
+    paginator = CursorPaginator(posts, settings.POSTS_COUNT, **page_key)
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if page_number is None:
+        page_obj = paginator.cursor_page(request.GET.get('cursor'))
+    else:
+        page_obj = paginator.lazy_page(page_number)
     return {'paginator': paginator, 'page_number': page_number,
             'page_obj': page_obj}
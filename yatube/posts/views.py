@@ -1,57 +1,99 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from posts.cache import cache_feed
+from posts.conditional import (conditional, feed_validators,
+                               follow_validators, post_validators)
+from posts.counters import get_author_stats
+from posts.feed import FEED_PAGE_KEY, follow_feed, mark_feed_seen
 from posts.forms import PostForm, CommentForm
-from posts.utils import get_page
-from .models import Group, Post, Comment, Follow, User
+from posts.groups import get_group, groups_directory
+from posts.search import search_page
+from posts.streaming import stream_render
+from posts.thumbnails import schedule_thumbnail
+from posts.utils import get_comments_page, get_page
+from .models import Post, Follow, User
 
 
-@cache_page(20, key_prefix="index_page")
+@conditional(feed_validators('index'))
+@cache_feed('index')
 def index(request):
     """Функция главной страницы."""
-    context = get_page(Post.objects.select_related(
-        'group', 'author').all(), request)
-    return render(request, 'posts/index.html', context)
+    context = get_page(Post.objects.for_feed(), request)
+    return stream_render(request, 'posts/index.html', context)
 
 
+@conditional(feed_validators('group:{slug}'))
+@cache_feed('group:{slug}')
 def group_posts(request, slug):
     """Функция страницы групп."""
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = get_group(slug)
+    if group is None:
+        raise Http404
     context = {
         'group': group,
-        'posts': posts,
     }
-    context.update(get_page(group.posts.all(), request))
-    return render(request, 'posts/group_list.html', context)
+    context.update(get_page(group.posts.for_feed(), request))
+    return stream_render(request, 'posts/group_list.html', context)
+
+
+def groups(request):
+    """Функция страницы со списком групп."""
+    context = {
+        'groups': groups_directory(),
+    }
+    return render(request, 'posts/groups.html', context)
 
 
+@conditional(feed_validators('profile:{username}'))
+@cache_feed('profile:{username}')
 def profile(request, username):
     """Функция страницы пользователя, посты автора."""
     following = ''
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
     if request.user.is_authenticated:
         following = Follow.objects.filter(
             user=request.user, author=author).exists()
     context = {
         'author': author,
+        'author_stats': get_author_stats(author),
         'following': following,
     }
-    context.update(get_page(author.posts.all(), request))
-    return render(request, 'posts/profile.html', context)
+    context.update(get_page(author.posts.for_feed(), request))
+    return stream_render(request, 'posts/profile.html', context)
 
 
+def search(request):
+    """Функция страницы поиска по тексту постов."""
+    query = request.GET.get('q', '').strip()
+    with_comments = bool(request.GET.get('comments'))
+    context = {
+        'query': query,
+        'with_comments': with_comments,
+        'page_query': urlencode(
+            {'q': query, 'comments': 'on'} if with_comments
+            else {'q': query}) + '&',
+    }
+    if query:
+        context['page_obj'] = search_page(
+            query, request.GET.get('page'), with_comments)
+    return render(request, 'posts/search.html', context)
+
+
+@conditional(post_validators)
 def post_detail(request, post_id):
     """Функция страницы отдельного поста."""
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.for_detail(), pk=post_id)
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.select_related(
-        'author').filter(post=post)
     context = {
         'post': post,
+        'author_stats': get_author_stats(post.author),
         'form': form,
-        'comments': comments,
+        'comments': get_comments_page(post, request.GET.get('cursor')),
     }
     return render(request, 'posts/post_detail.html', context)
 
@@ -65,9 +107,9 @@ def post_create(request):
     )
     form.instance.author = request.user
     if form.is_valid():
-        form.save()
+        post = form.save()
+        schedule_thumbnail(post)
         return redirect('posts:profile', form.instance.author)
-    form = PostForm()
     return render(request, 'posts/create_post.html', {'form': form})
 
 
@@ -88,7 +130,9 @@ def post_edit(request, post_id):
         'edit_post': edit_post,
     }
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnail(post)
         return redirect('posts:post_detail', post_id)
     return render(request, 'posts/create_post.html', context)
 
@@ -96,7 +140,8 @@ def post_edit(request, post_id):
 @login_required
 def add_comment(request, post_id):
     """Добавление комментария к посту."""
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
@@ -107,16 +152,16 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional(follow_validators)
 def follow_index(request):
     """Лента постов подписок"""
-    post = Post.objects.filter(
-        author__following__user=request.user
-    )
+    post = follow_feed(request.user).for_feed()
+    mark_feed_seen(request.user)
     context = {
         'post': post,
     }
-    context.update(get_page(post, request))
-    return render(request, 'posts/follow.html', context)
+    context.update(get_page(post, request, **FEED_PAGE_KEY))
+    return stream_render(request, 'posts/follow.html', context)
 
 
 @login_required
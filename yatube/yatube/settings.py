@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.QueryInspectorMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -64,7 +67,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.profiling.ProfiledDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -92,6 +95,40 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения: пути к файлам SQLite через запятую в YATUBE_REPLICAS.
+# Локально копии основной базы обновляет команда sync_replicas, в тестах
+# реплики зеркалируют default.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.environ.get('YATUBE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'posts:api_index',
+    'posts:api_group_list',
+    'posts:api_profile',
+    'posts:api_post_detail',
+    'posts:api_follow_index',
+    'posts:post_comments',
+)
+REPLICA_PRIMARY_APPS = ('sessions',)
+# Допустимое отставание реплик, секунды: столько после изменения
+# пользователь читает из основной базы, и столько живут в кеше страницы,
+# собранные по данным реплики.
+REPLICA_MAX_LAG = 10
+REPLICA_STICKY_COOKIE = 'read_primary'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -133,8 +170,28 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 POSTS_COUNT = 10
+# Ленты отправляются потоком: начало страницы сразу, затем карточки
+# постов по одной. У таких ответов нет Content-Length, поэтому режим
+# включается в развёртывании, где ответы сжимает и буферизует прокси.
+FEED_STREAMING = False
+COMMENTS_COUNT = 20
+# Сколько последних комментариев показывать под постом в ленте.
+COMMENT_PREVIEW_COUNT = 3
+# Число постов для ссылок на страницы пересчитывается не чаще, чем раз
+# в столько секунд.
+APPROXIMATE_COUNT_TIMEOUT = 60 * 5
+# Каталог групп с числом постов пересчитывается раз в столько секунд.
+GROUPS_DIRECTORY_TIMEOUT = 60 * 5
 LIMITATION_TEXT = 15
 
+# Лента подписок: сколько записей хранить на пользователя и после скольких
+# подписчиков посты автора не раскладываются, а забираются при чтении
+# ленты. Когда автор перестаёт быть «тяжёлым», его посты раскладываются
+# подписчикам пачками по FEED_BACKFILL_BATCH_SIZE записей.
+FEED_MAX_LENGTH = 1000
+FEED_FANOUT_LIMIT = 1000
+FEED_BACKFILL_BATCH_SIZE = 10000
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 LOGIN_URL = 'users:login'
@@ -146,8 +203,106 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Загрузки больше этого размера пишутся во временный файл, а не в память.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 512 * 1024
+# Картинки постов: предел размера файла и числа пикселей, большая сторона
+# после уменьшения и формат перекодирования (JPEG; WEBP — если Pillow
+# собран с ним).
+UPLOAD_IMAGE_MAX_SIZE = 10 * 2 ** 20
+UPLOAD_IMAGE_MAX_PIXELS = 50_000_000
+UPLOAD_IMAGE_MAX_SIDE = 1920
+UPLOAD_IMAGE_FORMAT = 'JPEG'
+UPLOAD_IMAGE_QUALITY = 85
+
+# Бюджеты SQL-запросов на view; в строгом режиме (в тестах) превышение
+# бюджета или повтор одного запроса больше QUERY_DUPLICATE_LIMIT раз — ошибка.
+QUERY_BUDGET_STRICT = False
+QUERY_DUPLICATE_LIMIT = 2
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 5,
+    'posts:groups': 4,
+    'posts:profile': 6,
+    'posts:post_detail': 6,
+    'posts:follow_index': 6,
+    'posts:search': 5,
+    'posts:post_create': 8,
+    'posts:post_edit': 7,
+    'posts:post_comments': 5,
+    'posts:api_index': 4,
+    'posts:api_group_list': 5,
+    'posts:api_profile': 5,
+    'posts:api_post_detail': 6,
+    'posts:api_follow_index': 6,
+    'posts:follow_unread': 3,
+    'posts:add_comment': 7,
+    'posts:profile_follow': 12,
+    'posts:profile_unfollow': 7,
+}
+
+# Миниатюры картинок создаются фоновыми потоками при загрузке;
+# 0 — создавать сразу в запросе.
+THUMBNAIL_WORKERS = 2
+# Адреса готового набора миниатюр картинки хранятся в кеше столько секунд.
+THUMBNAIL_URLS_TIMEOUT = 60 * 60 * 24
+# Неполный набор, пока миниатюры создаются, кешируется ненадолго.
+THUMBNAIL_PENDING_TIMEOUT = 10
+
+# Общий кеш для всех процессов: YATUBE_CACHE=redis://host:6379/0 (подойдёт
+# и команда cache_server) или file:///путь/к/каталогу. Без него у каждого
+# процесса свой кеш в памяти. Ключи получают префикс YATUBE_CACHE_PREFIX,
+# страницы длиннее CACHE_COMPRESS_MIN_LENGTH байт хранятся сжатыми.
+CACHE_URL = os.environ.get('YATUBE_CACHE', '')
+CACHE_COMPRESS_MIN_LENGTH = 1024
+if CACHE_URL.startswith('redis://'):
+    CACHE_BACKEND, CACHE_LOCATION = 'core.cache.RedisCache', CACHE_URL
+elif CACHE_URL.startswith('file://'):
+    CACHE_BACKEND = 'core.cache.FileBasedCache'
+    CACHE_LOCATION = CACHE_URL[len('file://'):]
+else:
+    CACHE_BACKEND, CACHE_LOCATION = 'core.cache.LocMemCache', ''
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+        'KEY_PREFIX': os.environ.get('YATUBE_CACHE_PREFIX', 'yatube'),
+        'OPTIONS': {
+            'COMPRESS_MIN_LENGTH': CACHE_COMPRESS_MIN_LENGTH,
+        },
     }
 }
+
+# Сессии ищутся в памяти процесса (SESSION_LOCAL_TIMEOUT секунд, не больше
+# SESSION_LOCAL_MAX_ENTRIES штук), затем в общем кеше и только потом в базе;
+# неизменённые не сохраняются. YATUBE_SESSION_ENGINE=
+# django.contrib.sessions.backends.signed_cookies хранит сессию в
+# подписанной cookie совсем без базы. Истёкшие сессии удаляет команда
+# expire_sessions пачками по SESSION_CLEANUP_BATCH_SIZE.
+SESSION_ENGINE = os.environ.get('YATUBE_SESSION_ENGINE', 'core.sessions')
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_LOCAL_TIMEOUT = 5
+SESSION_LOCAL_MAX_ENTRIES = 10000
+SESSION_CLEANUP_BATCH_SIZE = 1000
+
+# Страницы лент сбрасываются сменой поколения при изменении данных,
+# поэтому могут храниться долго.
+FEED_CACHE_TIMEOUT = 60 * 60 * 4
+# Устаревшая страница отдаётся ещё столько секунд, пока один запрос её
+# пересобирает; блокировка пересборки снимается сама через
+# FEED_REBUILD_LOCK_TIMEOUT. Чем больше BETA, тем раньше до срока
+# страница пересобирается заранее.
+FEED_STALE_TIMEOUT = 60
+FEED_REBUILD_LOCK_TIMEOUT = 10
+FEED_EARLY_EXPIRATION_BETA = 1.0
+
+BENCHMARK_DIR = os.path.join(BASE_DIR, 'benchmarks')
+
+# Профилирование выборки запросов: время фаз в заголовке Server-Timing,
+# для путей из PROFILING_DUMP_PATTERNS — дамп pstats или свёрнутых стеков
+# ('collapsed') в PROFILING_DIR.
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 0.01
+PROFILING_DUMP_PATTERNS = []
+PROFILING_FORMAT = 'pstats'
+PROFILING_INTERVAL = 0.001
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')